@@ -0,0 +1,109 @@
+"""ตรวจความถูกต้องของกรณีที่วัดเวลาไม่ได้ (เช่นแอปปิดกะทันหัน) รันพร้อม benchmark
+
+แต่ละ check คืน list ของข้อความที่ผิด (ว่าง = ผ่าน)
+"""
+import os
+import json
+
+from storage import image_store
+from storage.data_store import DataStore
+from storage.import_export import export_events, import_events
+from storage.journal import Journal
+
+TORN_LINE = '{"op":"tog'
+
+
+def check_torn_journal(workdir):
+    """entry ที่เขียนหลังบรรทัดที่เขียนไม่จบต้องไม่หายเมื่อเปิดแอปใหม่"""
+    path = os.path.join(workdir, "torn.json")
+    store = DataStore(path)
+    store.load()
+    store.add_event("before", "2026-01-01")
+    store.close()
+    with open(store.journal.path, "a", encoding="utf-8") as f:
+        f.write(TORN_LINE)
+
+    # เปิดใหม่ เพิ่มสองรายการ แล้ว "ปิดกะทันหัน" (ไม่เขียน data.json)
+    store = DataStore(path)
+    store.load()
+    store.add_event("after 1", "2026-01-02")
+    store.add_event("after 2", "2026-01-03")
+    store.journal.close()
+
+    titles = sorted(e.title for e in DataStore(path).load()["events"].values())
+    if titles != ["after 1", "after 2", "before"]:
+        return [f"torn journal: expected 3 events after restart, got {titles}"]
+    return []
+
+
+def check_torn_rotated_journal(workdir):
+    """rotate ต่อท้ายไฟล์ .1 ที่มีเศษบรรทัดค้างอยู่ได้โดย entry ไม่หาย"""
+    path = os.path.join(workdir, "rotate.journal")
+    with open(path + ".1", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"seq": 1, "op": "set"}) + "\n" + TORN_LINE)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"seq": 2, "op": "set"}) + "\n")
+
+    journal = Journal(path)
+    journal.rotate()
+    seqs = [entry["seq"] for entry in journal.replay()]
+    if seqs != [1, 2]:
+        return [f"torn rotated journal: expected seq [1, 2], got {seqs}"]
+    return []
+
+
+
+def check_dateless_round_trip(workdir):
+    """กิจกรรมที่ไม่มีวันที่ซึ่ง export CSV เขียนออกไปต้อง import กลับมาได้"""
+    store = DataStore(os.path.join(workdir, "export.json"))
+    store.load()
+    store.add_event("dated", "2026-01-01", "09:00")
+    store.add_event("someday", "")
+    path = os.path.join(workdir, "events.csv")
+    for _ in export_events(store, path):
+        pass
+    store.close()
+
+    store = DataStore(os.path.join(workdir, "import.json"))
+    store.load()
+    progress = list(import_events(store, path))[-1]
+    titles = sorted(e.title for e in store.load()["events"].values())
+    store.close()
+    if progress.skipped or titles != ["dated", "someday"]:
+        return [f"dateless round trip: expected both events back, got {titles} ({progress.skipped} skipped)"]
+    return []
+
+
+def check_image_gc_keeps_legacy(workdir):
+    """collect_garbage ลบเฉพาะไฟล์ hash ที่ไม่มีใครอ้างถึง รูปชื่อเดิมของแอปรุ่นก่อนต้องอยู่"""
+    source = os.path.join(workdir, "photo.jpg")
+    with open(source, "wb") as f:
+        f.write(b"jpeg bytes")
+    image_dir = os.path.join(workdir, "images")
+    os.makedirs(image_dir, exist_ok=True)
+    legacy = os.path.join(image_dir, "class_photo.jpg")
+    with open(legacy, "wb") as f:
+        f.write(b"old photo")
+
+    store = DataStore(os.path.join(workdir, "images.json"))
+    store.load()
+    saved_dir, image_store.IMAGE_DIR = image_store.IMAGE_DIR, image_dir
+    try:
+        orphan = image_store.import_image(source)
+        removed = image_store.collect_garbage(store)
+    finally:
+        image_store.IMAGE_DIR = saved_dir
+        store.close()
+    if removed != [os.path.abspath(orphan)] or not os.path.exists(legacy):
+        return [f"image gc: expected only {os.path.basename(orphan)} removed, got {removed}"]
+    return []
+
+
+CHECKS = (check_torn_journal, check_torn_rotated_journal, check_dateless_round_trip, check_image_gc_keeps_legacy)
+
+
+def run_checks(workdir):
+    failures = []
+    for check in CHECKS:
+        failures.extend(check(workdir))
+    return failures
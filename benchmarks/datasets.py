@@ -0,0 +1,43 @@
+import os
+import json
+import random
+from datetime import date, timedelta
+
+from storage.data_store import empty_data
+
+# ชื่อขนาดชุดข้อมูล -> จำนวนกิจกรรม
+SIZES = {"10": 10, "1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# วันอ้างอิงคงที่ ชุดข้อมูลจะเหมือนเดิมทุกครั้ง (จำนวนการ์ดบนจอ / widget เทียบกับ baseline ได้)
+REFERENCE_DATE = date(2026, 1, 1)
+
+WORDS = ["Quiz", "Homework", "Lab", "Project", "Exam", "Meeting", "Report", "Presentation"]
+
+
+def make_data(count: int, seed: int = 0) -> dict:
+    """ข้อมูลรูปแบบเดียวกับ data.json ที่มีกิจกรรม count รายการ กระจายอยู่รอบ ๆ REFERENCE_DATE ±1 ปี"""
+    rng = random.Random(seed)
+    reference = REFERENCE_DATE
+    data = empty_data()
+    for i in range(count):
+        day = reference + timedelta(days=rng.randint(-365, 365))
+        details = f"Chapter {rng.randint(1, 12)}" if rng.random() < 0.5 else ""
+        data["events"].append(
+            {
+                "id": f"{rng.getrandbits(128):032x}",
+                "title": f"{rng.choice(WORDS)} {i}",
+                "date": day.isoformat(),
+                "time": f"{rng.randint(8, 20):02d}:{rng.choice((0, 30)):02d}" if rng.random() < 0.7 else "",
+                "details": details,
+                "done": day < reference and rng.random() < 0.8,
+            }
+        )
+    return data
+
+
+def write_dataset(directory: str, size_name: str) -> str:
+    """เขียน data.json ขนาด size_name ลงใน directory คืน path ของไฟล์"""
+    path = os.path.join(directory, f"data-{size_name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(make_data(SIZES[size_name]), f, indent=4)
+    return path
@@ -0,0 +1,277 @@
+"""benchmark ของงานหลักในแต่ละหน้าจอ รันแบบ headless ได้บน Linux ทั่วไป
+
+    python -m benchmarks.run                      # ทุกขนาด เทียบกับ baseline.json
+    python -m benchmarks.run --sizes 10 1k        # เฉพาะบางขนาด
+    python -m benchmarks.run --update-baseline    # บันทึกผลเป็น baseline ใหม่
+
+วัดเวลา (median), หน่วยความจำสูงสุดที่จองระหว่างทำงาน (tracemalloc) และจำนวน widget
+ที่สร้าง ถ้าช้าลง / ใช้หน่วยความจำมากขึ้นเกิน tolerance หรือสร้าง widget มากกว่า
+baseline จะจบด้วย exit code 1 (เช่นเดียวกับเมื่อ check ใน benchmarks/checks.py ไม่ผ่าน)
+"""
+import os
+
+# ต้องตั้งก่อน import kivy: ไม่ใช้จอจริง / GPU และไม่พิมพ์ log ของ kivy
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+os.environ.setdefault("KIVY_GL_BACKEND", "mock")
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import importlib
+import statistics
+import tracemalloc
+from datetime import datetime
+
+from kivy.config import Config
+
+# ไม่ให้ Clock.tick() รอจังหวะเฟรม (maxfps) ระหว่างวัดเวลา
+Config.set("graphics", "maxfps", "0")
+
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.lang import Builder
+
+from benchmarks.checks import run_checks
+from benchmarks.datasets import REFERENCE_DATE, SIZES, write_dataset
+from screens.registry import KV_DIR, SCREENS
+from services import profiling
+from services.countdown import get_ticker
+from storage.data_store import DataStore, use_store
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+# ช้าลงเกินสัดส่วนนี้ถือว่า regression (ต้องช้าลงเกิน NOISE_MS ด้วย กันผลแกว่งของงานที่เร็วมาก)
+TOLERANCE = 0.5
+NOISE_MS = 2.0
+# "ตอนนี้" ของหน้า Event ตรึงไว้ที่วันอ้างอิงของชุดข้อมูล การ์ดในหน้าแรก (รอบ ๆ ตอนนี้)
+# จึงเป็นชุดเดิมไม่ว่าจะรันวันไหน
+NOW = datetime.combine(REFERENCE_DATE, datetime.min.time())
+# รอบที่วัดต่อหนึ่ง operation
+REPEAT = {
+    "load": 5,
+    "save": 5,
+    "event_enter": 3,
+    "refresh_events": 5,
+    "draw_calendar": 24,
+    "mark_done": 50,
+    "delete_event": 50,
+}
+
+
+def pump(frames=3):
+    """ให้ Clock รัน trigger ที่ค้างอยู่ (layout ของ RecycleView ฯลฯ) เหมือนผ่านไปหลายเฟรม"""
+    for _ in range(frames):
+        Clock.tick()
+
+
+def screen_class(name):
+    module, class_name, _ = SCREENS[name]
+    return getattr(importlib.import_module(module), class_name)
+
+
+def measure(run_once, repeat):
+    """เรียก run_once() repeat ครั้ง (คืน cleanup ได้ ซึ่งไม่นับเวลา) แล้วอีกหนึ่งครั้งเพื่อวัดหน่วยความจำ
+
+    คืน dict ของ ms (median), peak_kib และ widgets ต่อครั้ง
+    """
+    times = []
+    widgets_before = profiling.counters()["widgets"]
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cleanup = run_once()
+        times.append(time.perf_counter() - start)
+        if cleanup:
+            cleanup()
+    widgets = (profiling.counters()["widgets"] - widgets_before) / repeat
+
+    # tracemalloc ทำให้ช้าลงมาก จึงแยกรอบวัดหน่วยความจำออกจากรอบจับเวลา
+    tracemalloc.start()
+    cleanup = run_once()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if cleanup:
+        cleanup()
+
+    return {
+        "ms": round(statistics.median(times) * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+        "widgets": round(widgets, 1),
+    }
+
+
+def bench_size(size_name, workdir):
+    """รันทุก operation กับชุดข้อมูลขนาด size_name คืน {operation: ผล}"""
+    path = write_dataset(workdir, size_name)
+    results = {}
+
+    def load():
+        DataStore(path).load()
+
+    results["load"] = measure(load, REPEAT["load"])
+
+    store = DataStore(path)
+    store.load()
+    use_store(store)
+
+    def save():
+        store.save()
+        store.flush()
+
+    results["save"] = measure(save, REPEAT["save"])
+
+    # ------------------ Event screen ------------------
+    event_cls = screen_class("event")
+
+    def enter_event():
+        screen = event_cls(name="event")
+        Window.add_widget(screen)
+        screen.dispatch("on_pre_enter")
+        # on_enter สร้างรายการเองด้วยเวลาจริงถ้ายังไม่มี จึงสร้างก่อนด้วย NOW
+        screen.refresh_events(NOW)
+        screen.dispatch("on_enter")
+        pump()
+
+        def leave():
+            screen.dispatch("on_leave")
+            Window.remove_widget(screen)
+            store.remove_listener(screen.on_store_change)
+
+        return leave
+
+    results["event_enter"] = measure(enter_event, REPEAT["event_enter"])
+
+    screen = event_cls(name="event")
+    Window.add_widget(screen)
+    screen.refresh_events(NOW)
+    screen.dispatch("on_enter")
+    pump()
+
+    def refresh():
+        screen.refresh_events(NOW)
+        pump()
+
+    results["refresh_events"] = measure(refresh, REPEAT["refresh_events"])
+
+    ids = [row["record_id"] for row in screen.ids.event_list.data]
+
+    def mark_done():
+        screen.mark_done(ids[len(ids) // 2])
+        pump(1)
+
+    results["mark_done"] = measure(mark_done, REPEAT["mark_done"])
+
+    def delete_event():
+        if ids:
+            screen.delete_event(ids.pop())
+        pump(1)
+
+    results["delete_event"] = measure(delete_event, REPEAT["delete_event"])
+
+    screen.dispatch("on_leave")
+    Window.remove_widget(screen)
+    store.remove_listener(screen.on_store_change)
+
+    # ------------------ Calendar screen ------------------
+    calendar = screen_class("calendar")(name="calendar")
+    Window.add_widget(calendar)
+    calendar.dispatch("on_enter")
+    pump()
+
+    def next_month():
+        calendar.next_month()
+        pump(1)
+
+    results["draw_calendar"] = measure(next_month, REPEAT["draw_calendar"])
+    Window.remove_widget(calendar)
+
+    store.close()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """คืนรายการข้อความของ operation ที่แย่กว่า baseline"""
+    failures = []
+    for size_name, operations in results.items():
+        for op, result in operations.items():
+            base = baseline.get(size_name, {}).get(op)
+            if base is None:
+                continue
+            label = f"{size_name} {op}"
+            if result["ms"] > base["ms"] * (1 + tolerance) and result["ms"] - base["ms"] > NOISE_MS:
+                failures.append(f"{label}: {result['ms']:.2f} ms (baseline {base['ms']:.2f} ms)")
+            if result["peak_kib"] > base["peak_kib"] * (1 + tolerance) and result["peak_kib"] - base["peak_kib"] > 64:
+                failures.append(
+                    f"{label}: peak {result['peak_kib']:.0f} KiB (baseline {base['peak_kib']:.0f} KiB)"
+                )
+            # จำนวน widget ไม่ขึ้นกับความเร็วเครื่อง เทียบตรง ๆ ได้
+            if result["widgets"] > base["widgets"]:
+                failures.append(f"{label}: {result['widgets']} widgets (baseline {base['widgets']})")
+    return failures
+
+
+def print_table(results):
+    print(f"{'size':>6} {'operation':<16} {'ms':>10} {'peak KiB':>10} {'widgets':>8}")
+    for size_name, operations in results.items():
+        for op, result in operations.items():
+            print(
+                f"{size_name:>6} {op:<16} {result['ms']:>10.3f} "
+                f"{result['peak_kib']:>10.1f} {result['widgets']:>8.1f}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the screens' hot paths")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    for _, _, kv_file in SCREENS.values():
+        Builder.load_file(os.path.join(KV_DIR, kv_file))
+    # ใช้ตัวนับของ profiling นับ widget (เมธอดของหน้าจอไม่ถูกห่อด้วย span เพราะ import ไปก่อนแล้ว)
+    profiling.ENABLED = True
+    profiling.install()
+
+    workdir = tempfile.mkdtemp(prefix="student-life-bench-")
+    results = {}
+    try:
+        check_failures = run_checks(workdir)
+        for size_name in args.sizes:
+            results[size_name] = bench_size(size_name, workdir)
+            get_ticker().stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    for failure in check_failures:
+        print(f"CHECK FAILED {failure}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=4)
+        print(f"baseline written to {args.baseline}")
+        return 1 if check_failures else 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare against (run with --update-baseline)")
+        return 1 if check_failures else 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures = compare(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures or check_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
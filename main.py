@@ -1,38 +1,70 @@
-import os
-from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager
-from kivy.lang import Builder
+from services.startup import get_startup_timer
 
-# -----------------------
-# Import screens
-# -----------------------
-from screens.home_screen import HomeScreen
-from screens.myclass_screen import MyClassScreen
-from screens.calendar_screen import CalendarScreen
-from screens.event_screen import EventScreen
+timer = get_startup_timer()
+
+with timer.phase("import kivy"):
+    from kivy.app import App
+    from kivy.clock import Clock
 
 # -----------------------
-# Load KV files
+# Screens
 # -----------------------
-BASE_DIR = os.path.dirname(__file__)
-Builder.load_file(os.path.join(BASE_DIR, "kv/home.kv"))
-Builder.load_file(os.path.join(BASE_DIR, "kv/myclass.kv"))
-Builder.load_file(os.path.join(BASE_DIR, "kv/calendar.kv"))
-Builder.load_file(os.path.join(BASE_DIR, "kv/event.kv"))
+# แต่ละหน้าจอ import module / โหลดไฟล์ kv / สร้าง widget ตอนถูกเปิดครั้งแรก
+# (ดู screens/registry.py)
+with timer.phase("import app modules"):
+    from screens.registry import LazyScreenManager
+    from services import profiling
+    from services.reminders import get_reminders
+    from storage.data_store import get_store
+    from storage.archive import archive_old_events
+    from storage.image_store import validate_assets
+
+
+profiling.install()
 
 
 # -----------------------
 # App
 # -----------------------
 class StudentLifeApp(App):
+    @profiling.profiled("app.build")
     def build(self):
-        sm = ScreenManager()
-        sm.add_widget(HomeScreen(name="home"))
-        sm.add_widget(MyClassScreen(name="myclass"))
-        sm.add_widget(CalendarScreen(name="calendar"))
-        sm.add_widget(EventScreen(name="event"))
+        # โหลดข้อมูลครั้งเดียวตอนเริ่มแอป ทุกหน้าจอใช้ store ตัวเดียวกัน
+        with timer.phase("load store"):
+            self.store = get_store()
+            self.store.load()
+        # แปลง path รูปแบบเก่าและตรวจไฟล์รูปทั้งหมดครั้งเดียว
+        with timer.phase("validate assets"):
+            validate_assets(self.store)
+        # กิจกรรมที่เลยกำหนดมานานย้ายไปไฟล์เก็บถาวร data.json จะเหลือเฉพาะที่ยังใช้อยู่
+        with timer.phase("archive old events"):
+            archive_old_events(self.store)
+
+        # สร้างแค่หน้า home ก่อน หน้าอื่นสร้างเมื่อถูกเปิด / prefetch ตอนว่าง
+        sm = LazyScreenManager()
+        sm.current = "home"
         return sm
 
+    def on_start(self):
+        timer.report_after_first_frame()
+        # STUDENT_LIFE_PROFILE=1: แสดงเวลาต่อเฟรมบนจอ (ดู services/profiling.py)
+        self.frame_overlay = profiling.show_overlay()
+        # สร้าง heap ของการแจ้งเตือนหลังเฟรมแรก ไม่ให้หน่วงการเปิดแอป
+        Clock.schedule_once(lambda dt: get_reminders().start(), 0)
+
+    def on_pause(self):
+        # Android อาจปิดแอปได้ทุกเมื่อหลัง pause จึงเขียนข้อมูลที่ค้างอยู่ก่อน
+        self.store.flush()
+        return True
+
+    def on_resume(self):
+        pass
+
+    def on_stop(self):
+        get_reminders().stop()
+        self.store.close()
+        profiling.dump()
+
 
 if __name__ == "__main__":
     StudentLifeApp().run()
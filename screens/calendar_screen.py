@@ -1,5 +1,3 @@
-import os
-import json
 from datetime import date, timedelta, datetime
 from kivy.uix.screenmanager import Screen
 from kivy.uix.button import Button
@@ -9,9 +7,8 @@ from kivy.metrics import dp
 from kivy.properties import NumericProperty
 from kivy.graphics import Color, RoundedRectangle
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
-DATA_PATH = os.path.join(DATA_DIR, "data.json")
+from services.profiling import profiled
+from storage.data_store import get_store
 
 # Month names
 MONTH_NAMES = [
@@ -30,20 +27,23 @@ MONTH_NAMES = [
 ]
 
 
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        return {"tasks": [], "class_image": "", "events": []}
-    try:
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {"tasks": [], "class_image": "", "events": []}
+# ตัวเลือกการเกิดซ้ำในหน้าต่างเพิ่มกิจกรรม -> RepeatRule (None = ครั้งเดียว)
+REPEAT_OPTIONS = {
+    "Does not repeat": None,
+    "Daily": {"freq": "daily"},
+    "Weekly": {"freq": "weekly"},
+    "Every 2 weeks": {"freq": "weekly", "interval": 2},
+    "Weekdays (Mon-Fri)": {"freq": "weekly", "weekdays": [0, 1, 2, 3, 4]},
+}
 
+# ปฏิทินแสดงได้สูงสุด 6 สัปดาห์
+CALENDAR_CELLS = 6 * 7
 
-def save_data(data):
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+
+class DayCell(Button):
+    """ปุ่มวันที่หนึ่งช่องในตารางปฏิทิน (day = 0 คือช่องว่าง)"""
+
+    day = NumericProperty(0)
 
 
 class CalendarScreen(Screen):
@@ -52,6 +52,7 @@ class CalendarScreen(Screen):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self._cells = []
         today = date.today()
         self.current_year = today.year
         self.current_month = today.month
@@ -81,9 +82,11 @@ class CalendarScreen(Screen):
         self.current_year += 1
         self.draw_calendar()
 
+    @profiled("calendar.draw_calendar")
     def draw_calendar(self):
         container: GridLayout = self.ids.days_container
-        container.clear_widgets()
+        if not self._cells:
+            self.build_cells(container)
 
         # Update month/year label
         month_name = MONTH_NAMES[self.current_month - 1]
@@ -103,49 +106,78 @@ class CalendarScreen(Screen):
             )
         total_days = last_day.day
         today = date.today()
-
-        # ใส่ช่องว่างก่อนวันที่แรก
-        for _ in range(start_weekday):
-            empty_btn = Button(text="", disabled=True, size_hint_y=None, height=dp(50))
-            empty_btn.canvas.before.clear()
-            container.add_widget(empty_btn)
-
-        # สร้างปุ่มวันที่
-        for day in range(1, total_days + 1):
-            day_date = date(self.current_year, self.current_month, day)
-            is_today = day_date == today
-
-            day_btn = Button(text=str(day), size_hint_y=None, height=dp(50), background_normal="")
-
-            # Style current day
+        # จำนวนกิจกรรมของทุกวันในเดือนนี้ ดึงจากดัชนีวันที่ครั้งเดียว
+        summary = get_store().month_summary(self.current_year, self.current_month)
+
+        # ใช้ปุ่มชุดเดิมทุกเดือน แค่เปลี่ยนข้อความ สี และสถานะ
+        for index, cell in enumerate(self._cells):
+            day = index - start_weekday + 1
+
+            # ช่องว่างก่อนวันที่แรก / หลังวันสุดท้าย
+            if day < 1 or day > total_days:
+                cell.day = 0
+                cell.text = ""
+                cell.disabled = True
+                cell.background_color = (1, 1, 1, 1)
+                cell.opacity = 1 if day < 1 else 0
+                continue
+
+            is_today = date(self.current_year, self.current_month, day) == today
+
+            cell.day = day
+            cell.text = self.day_text(day, summary.get(day))
+            cell.disabled = False
+            cell.opacity = 1
+            cell.background_normal = ""
+            cell.color = (1, 1, 1, 1)
+            # Style current day / others day
             if is_today:
-                if is_today:
-                    day_btn.background_color = (0.65, 0.08, 0.28, 1)
-                    day_btn.color = (1, 1, 1, 1)
-            # Style others day
+                cell.background_color = (0.65, 0.08, 0.28, 1)
             else:
-                day_btn.background_color = (0.85, 0.4, 0.6, 1)
-                day_btn.color = (1, 1, 1, 1)
-
+                cell.background_color = (0.85, 0.4, 0.6, 1)
 
-            day_btn.bind(on_press=lambda btn, d=day: self.add_task_for_day(d))
-            container.add_widget(day_btn)
+    def build_cells(self, container):
+        """สร้างปุ่ม 6x7 ช่องครั้งเดียว แล้วใช้ซ้ำทุกครั้งที่เปลี่ยนเดือน"""
+        container.clear_widgets()
+        for _ in range(CALENDAR_CELLS):
+            cell = DayCell(markup=True, halign="center", size_hint_y=None, height=dp(50))
+            cell.bind(on_press=self.on_day_press)
+            container.add_widget(cell)
+            self._cells.append(cell)
+
+    def on_day_press(self, cell):
+        if cell.day:
+            self.add_task_for_day(cell.day)
+
+    @staticmethod
+    def day_text(day, counts):
+        """เลขวันที่ + badge จำนวนกิจกรรม (มีจุดถ้ายังมีงานที่ไม่เสร็จ)"""
+        if not counts:
+            return str(day)
+        total, pending = counts
+        dot = "• " if pending else ""
+        return f"{day}\n[size=11sp]{dot}{total}[/size]"
 
     def add_task_for_day(self, day):
         from kivy.uix.popup import Popup
         from kivy.uix.textinput import TextInput
         from kivy.uix.boxlayout import BoxLayout
         from kivy.uix.button import Button
+        from kivy.uix.spinner import Spinner
 
         popup = Popup(
             title=f"Add Task/Event for {day}/{self.current_month}/{self.current_year}",
-            size_hint=(0.8, 0.5),
+            size_hint=(0.8, 0.65),
         )
 
         layout = BoxLayout(orientation="vertical", spacing=dp(10), padding=dp(10))
         title_input = TextInput(hint_text="Title", multiline=False)
         time_input = TextInput(hint_text="HH:MM (optional)", multiline=False)
         details_input = TextInput(hint_text="Details (optional)", multiline=True)
+        repeat_input = Spinner(
+            text="Does not repeat", values=list(REPEAT_OPTIONS), size_hint_y=None, height=dp(40)
+        )
+        until_input = TextInput(hint_text="Repeat until YYYY-MM-DD (optional)", multiline=False)
 
         add_btn = Button(text="Add", size_hint_y=None, height=dp(40))
 
@@ -155,23 +187,32 @@ class CalendarScreen(Screen):
                 return
             task_date = f"{self.current_year}-{self.current_month:02d}-{day:02d}"
 
-            data = load_data()
-            data.setdefault("events", []).append(
-                {
-                    "title": title,
-                    "date": task_date,
-                    "time": time_input.text.strip(),
-                    "details": details_input.text.strip(),
-                    "done": False,
-                }
+            # กิจกรรมที่เกิดซ้ำบันทึกเป็น record เดียว ไม่ใช่สำเนาทุกครั้ง
+            repeat = REPEAT_OPTIONS[repeat_input.text]
+            until = until_input.text.strip()
+            if repeat is not None and until:
+                try:
+                    date.fromisoformat(until)
+                except ValueError:
+                    return
+                repeat = dict(repeat, until=until)
+
+            get_store().add_event(
+                title,
+                task_date,
+                time=time_input.text.strip(),
+                details=details_input.text.strip(),
+                repeat=repeat,
             )
-            save_data(data)
             popup.dismiss()
+            self.draw_calendar()
 
         add_btn.bind(on_press=add_task)
         layout.add_widget(title_input)
         layout.add_widget(time_input)
         layout.add_widget(details_input)
+        layout.add_widget(repeat_input)
+        layout.add_widget(until_input)
         layout.add_widget(add_btn)
 
         popup.content = layout
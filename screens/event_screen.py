@@ -1,316 +1,581 @@
 import os
-import json
+from functools import partial
+
+from kivy.clock import Clock
+from kivy.logger import Logger
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.label import Label
-from kivy.uix.button import Button
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.properties import BooleanProperty, ObjectProperty, StringProperty
 from kivy.metrics import dp
-from kivy.graphics import Color, RoundedRectangle, Line
 from datetime import datetime
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
-DATA_PATH = os.path.join(DATA_DIR, "data.json")
+from services.countdown import countdown_text, get_ticker
+from services.profiling import profiled
+from storage import archive
+from storage.data_store import get_store
+from storage.import_export import TRANSFER_ERRORS, export_events, export_path, import_events
+from storage.recurrence import UPCOMING_HORIZON, Occurrence, expand, nearest_occurrence, split_occurrence_id
+from storage.search_index import get_search_index
 
+# จำนวนกิจกรรมต่อหนึ่งหน้า หน้าแรกมีกิจกรรมที่ใกล้ถึงกำหนดที่สุด PAGE_SIZE รายการ
+# และที่ผ่านไปแล้วล่าสุดอีก PAGE_SIZE รายการ ที่เหลือโหลดเมื่อเลื่อนขึ้น / ลง
+PAGE_SIZE = 50
+# โหลดหน้าถัดไปเมื่อเลื่อนเข้าใกล้ขอบบน / ล่างของรายการเหลือระยะนี้
+LOAD_MORE_DISTANCE = dp(400)
+# แสดงผลการค้นหาสูงสุดเท่านี้ (ใหม่สุดก่อน)
+SEARCH_LIMIT = 200
 
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        return {"tasks": [], "class_image": "", "events": []}
-    try:
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {"tasks": [], "class_image": "", "events": []}
 
+class EventCard(RecycleDataViewBehavior, BoxLayout):
+    """การ์ดกิจกรรมหนึ่งใบใน RecycleView (หน้าตาอยู่ใน kv/event.kv)
 
-def save_data(data):
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    RecycleView สร้างการ์ดเท่าที่มองเห็นบนจอ แล้วนำกลับมาใช้ใหม่
+    โดยเปลี่ยนแค่ข้อมูลตาม row ใน data
+    """
 
+    record_id = StringProperty("")
+    title = StringProperty("")
+    date_text = StringProperty("")
+    details = StringProperty("")
+    countdown = StringProperty("")
+    due = ObjectProperty(None, allownone=True)
+    done = BooleanProperty(False)
+    series = BooleanProperty(False)  # เป็นกิจกรรมที่เกิดซ้ำ (มีปุ่ม Series สำหรับทั้งชุด)
 
-class EventScreen(Screen):
-    def on_enter(self):
-        self.refresh_events()
-
-    def refresh_events(self):
-        container = self.ids.event_container
-        container.clear_widgets()
-        data = load_data()
-
-        combined = []
-
-        # รวม tasks เป็นแบบ events
-        for t in data.get("tasks", []):
-            combined.append(
-                {
-                    "title": t["task"],
-                    "date": t.get("date", ""),
-                    "time": "",
-                    "details": t.get("details", ""),
-                    "done": t.get("done", False),
-                    "is_task": True,
-                }
-            )
+    def refresh_view_attrs(self, rv, index, data):
+        super().refresh_view_attrs(rv, index, data)
+        # คำนวณเวลาที่เหลือตอนการ์ดถูกนำมาแสดง แล้วให้ ticker ดูแลต่อ
+        self.update_countdown(datetime.now())
+        get_ticker().consider(self.due)
 
-        # รวม events
-        for e in data.get("events", []):
-            combined.append(
-                {
-                    "title": e["title"],
-                    "date": e.get("date", ""),
-                    "time": e.get("time", ""),
-                    "details": e.get("details", ""),
-                    "done": e.get("done", False),
-                    "is_task": False,
-                }
-            )
+    def update_countdown(self, now):
+        self.countdown = countdown_text(self.due, now)
 
-        # เรียงตามวันที่ล่าสุด
-        combined.sort(key=lambda x: x["date"], reverse=True)
 
-        if not combined:
-            empty_label = Label(
-                text="No tasks or events yet.\nAdd one from Calendar!",
-                font_size=dp(16),
-                color=(0.5, 0.5, 0.5, 1),
-                size_hint_y=None,
-                height=dp(80),
-            )
-            container.add_widget(empty_label)
-            self._combined_events = combined
-            return
-
-        for idx, ev in enumerate(combined):
-            # การ์ดแต่ละอัน
-            card = BoxLayout(
-                orientation="vertical", size_hint_y=None, padding=(dp(12), dp(10), dp(12), dp(10)), spacing=dp(6)
-            )
-
-            # ความสูงขึ้นอยู่กับรายละเอียด
-            card_height = dp(60)  # base
-            if ev.get("details"):
-                card_height += dp(18)
-            card_height += dp(35)  # สำหรับปุ่ม
-            card.height = card_height
-
-            # Background
-            card.canvas.before.clear()
-            with card.canvas.before:
-                # พื้นหลัง
-                Color(0.97, 0.97, 0.98, 1)
-                card.bg = RoundedRectangle(
-                    size=card.size,
-                    pos=card.pos,
-                    radius=[dp(8)]
-                )
-
-                # กรอบ
-                Color(0.8, 0.8, 0.8, 1)
-                card.border = Line(
-                    rounded_rectangle=(
-                        card.x,
-                        card.y,
-                        card.width,
-                        card.height,
-                        dp(8)
-                    ),
-                    width=1.2
-                )
-
-            # อัปเดตตำแหน่ง/ขนาด ทั้ง bg และ border
-            def update_canvas(instance, value, card=card):
-                card.bg.pos = card.pos
-                card.bg.size = card.size
-                card.border.rounded_rectangle = (
-                    card.x,
-                    card.y,
-                    card.width,
-                    card.height,
-                    dp(8)
-                )
-
-            card.bind(pos=update_canvas, size=update_canvas)
-
-
-            
-
-
-
-            # ===== HEADER ROW =====
-            header = BoxLayout(
-                orientation="horizontal",
-                size_hint_y=None,
-                height=dp(25),
-                padding=(dp(8), 20, dp(8), 0)  
-            )
+class ArchivedCard(RecycleDataViewBehavior, BoxLayout):
+    """กิจกรรมที่เก็บถาวรหนึ่งรายการในหน้าต่าง Archived (หน้าตาอยู่ใน kv/event.kv)"""
 
-            # STATUS
+    record_id = StringProperty("")
+    title = StringProperty("")
+    date_text = StringProperty("")
+    done = BooleanProperty(False)
 
-            
 
-            status_text = "Done" if ev["done"] else "Pending"
-            status_label = Label(
-                text=f"{status_text}",
-                size_hint_x=None,
-                width=dp(80),
-                font_size=dp(16),
-                color=(0.2, 0.6, 0.3, 1) if ev["done"] else (0.9, 0.2, 0.2, 1)
-
-            )
-
-            # TITLE
-            title_label = Label(
-                text=ev["title"],
-                font_size=dp(14),
-                bold=True,
-                halign="center",
-                valign="middle",
-                size_hint_x=1,  
-                color = (0, 0, 0, 1)  # light grey
-
-            )
-            title_label.bind(width=lambda instance, value: setattr(instance, "text_size", (value, None)))
-
-            # ===== DAY LEFT =====
-            countdown_text = ""
-
-            if ev["date"]:
-                try:
-                    if ev.get("time"):
-                        event_datetime = datetime.strptime(
-                            f"{ev['date']} {ev['time']}",
-                            "%Y-%m-%d %H:%M"
-                        )
-                    else:
-                        event_datetime = datetime.strptime(
-                            ev["date"],
-                            "%Y-%m-%d"
-                        )
-
-                    now = datetime.now()
-                    delta = event_datetime - now
-                    total_seconds = int(delta.total_seconds())
-
-                    if total_seconds > 0:
-                        days = total_seconds // (24 * 3600)
-                        hours = (total_seconds % (24 * 3600)) // 3600
-                        countdown_text = f"{days} D {hours} H Left"
-                    else:
-                        countdown_text = "Passed"
-
-                except:
-                    countdown_text = ""
-
-            dayleft_label = Label(
-                text=f"{countdown_text}" if countdown_text else "",
-                size_hint_x=None,
-                width=dp(80),
-                font_size=dp(16),
-                color=(0.3, 0.5, 0.9, 1)
-            )
-
-            # ใส่เข้า header
-            header.add_widget(status_label)
-            header.add_widget(title_label)
-            header.add_widget(dayleft_label)
-
-            card.add_widget(header)
-
-            
-
-            # days left
-            
+class EventScreen(Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._built = False
+        # record id -> sort_key ของ row ใน rows() หาตำแหน่งด้วย binary search
+        # (ไม่ต้องเลื่อนตำแหน่งของ row ที่เหลือทุกครั้งที่แทรก / ลบ)
+        self._keys = {}
+        self._cursor = None  # timeline_key ของ record เก่าสุดที่โหลดมา
+        self._last_key = None  # sort_key ของ row สุดท้ายที่โหลดมา
+        self._exhausted = False  # โหลดถึงกิจกรรมที่เก่าที่สุดแล้ว
+        self._newer_cursor = None  # timeline_key ของ record ใหม่สุดที่โหลดมา
+        self._first_key = None  # sort_key ของ record ใหม่สุดที่โหลดมา
+        self._top_reached = False  # โหลดถึงกิจกรรมที่ใหม่ที่สุดแล้ว
+        # occurrence ของกิจกรรมที่เกิดซ้ำถูกขยายไว้เฉพาะช่วง [_window_start, _window_end) ที่โหลดแล้ว
+        # และไม่เกิน _horizon (กิจกรรมที่ไม่มีวันสิ้นสุดจะได้ไม่ยาวไม่รู้จบ)
+        self._window_start = None
+        self._window_end = None
+        self._horizon = None
+        self._scroll_y = 1.0  # ใช้ดูว่ากำลังเลื่อนขึ้นหรือลง
+        self._query = ""
+        # ระหว่างค้นหา event_list แสดงผลการค้นหา ส่วนรายการปกติเก็บไว้ที่นี่ (None = ไม่ได้ค้นหา)
+        self._browse_rows = None
+        self._search_trigger = Clock.create_trigger(self.run_search)
+        self._transfer = None  # ClockEvent ของการนำเข้า / ส่งออกที่กำลังทำอยู่
+        self._archive_list = None  # RecycleView ในหน้าต่าง Archived ที่เปิดอยู่
+        self._archive_year = None
+        get_store().add_listener(self.on_store_change)
+
+    def on_kv_post(self, base_widget):
+        self.ids.event_list.bind(scroll_y=self.on_list_scroll)
 
-            # วันที่และเวลา
-            dt_text = ev["date"]
-            if ev["time"]:
-                dt_text += f" {ev['time']}"
-            dt_label = Label(
-                text=dt_text,
-                font_size=dp(11),
-                color=(0.5, 0.5, 0.5, 1),
+    def on_enter(self):
+        # สร้างรายการครั้งแรกครั้งเดียว หลังจากนั้นอัปเดตตามการเปลี่ยนแปลงใน store
+        if not self._built:
+            self.refresh_events()
+        get_ticker().start(self.visible_cards)
+
+    def on_leave(self):
+        get_ticker().stop()
+
+    def visible_cards(self):
+        return self.ids.event_list.layout_manager.children
+
+    @profiled("event.refresh_events")
+    def refresh_events(self, now=None):
+        """โหลดหน้าแรกรอบ ๆ now: กิจกรรมที่ใกล้ถึงกำหนดที่สุด และที่ผ่านไปแล้วล่าสุด อย่างละ PAGE_SIZE รายการ"""
+        now = now or datetime.now()
+        self._cursor = self._newer_cursor = get_store().moment_key(now)
+        self._first_key = self._last_key = None
+        self._window_end = self._window_start = now
+        self._horizon = now + UPCOMING_HORIZON
+        # ทุก row ของหน้าที่ใหม่กว่าครบกำหนดตั้งแต่ now ส่วนอีกหน้าก่อน now ต่อกันจึงเรียงอยู่แล้ว
+        rows = self.fetch_newer(PAGE_SIZE) + self.fetch_page(PAGE_SIZE)
+        self._keys = {row["record_id"]: row["sort_key"] for row in rows}
+        self._scroll_y = 1.0
+        self.ids.event_list.data = rows
+        self.ids.event_list.scroll_y = 1
+        self._built = True
+
+    @profiled("event.load_more")
+    def load_more(self):
+        """ต่อท้ายรายการด้วยหน้าถัดไป (กิจกรรมที่เก่ากว่า)"""
+        if self._exhausted:
+            return
+        rows = self.fetch_page(PAGE_SIZE)
+        self.remember(rows)
+        self.rows().extend(rows)
+
+    @profiled("event.load_newer")
+    def load_newer(self):
+        """เพิ่มหน้าที่ใหม่กว่าไว้บนสุด โดยให้การ์ดที่กำลังดูอยู่ค้างอยู่ที่เดิมบนจอ"""
+        if self._top_reached:
+            return
+        fresh = self.fetch_newer(PAGE_SIZE)
+        if not fresh:
+            return
+        rv = self.ids.event_list
+        layout = rv.layout_manager
+        hidden = layout.height - rv.height
+        from_top = (1 - rv.scroll_y) * max(hidden, 0)
+        added = len(fresh) * (layout.default_size[1] + layout.spacing)
+        self.remember(fresh)
+        # แทนทั้ง list (RecycleView ไม่รองรับการแทรก slice ที่ความยาวเปลี่ยน)
+        rv.data = fresh + list(rv.data)
+        # scroll_y เป็นสัดส่วน ความสูงที่เพิ่มด้านบนต้องนับเข้าไปด้วย (layout สูงขึ้นในเฟรมถัดไป)
+        if hidden + added > 0:
+            self._scroll_y = rv.scroll_y = min(1, max(0, 1 - (from_top + added) / (hidden + added)))
+
+    def fetch_newer(self, limit):
+        """record ที่ใหม่กว่าส่วนที่โหลดไว้ ไม่เกิน limit รายการ (ใกล้ที่สุดก่อน) แปลงเป็น row เรียงจากใหม่ไปเก่า
+
+        รวม occurrence ของช่วงเวลาเดียวกันแต่ไม่เกิน _horizon
+        """
+        store = get_store()
+        records = store.timeline_page(before=self._newer_cursor, limit=limit)
+        self._top_reached = len(records) < limit
+        rows = [self.row_for(record) for record in records]
+        if records:
+            self._newer_cursor = store.timeline_key(records[0])
+            self._first_key = rows[0]["sort_key"]
+
+        end = self._horizon if self._top_reached else min(records[0].due, self._horizon)
+        if end > self._window_end:
+            occurrences = store.occurrences(self._window_end, end)
+            if occurrences:
+                rows.extend(self.row_for(o) for o in occurrences)
+                rows.sort(key=lambda row: row["sort_key"], reverse=True)
+            self._window_end = end
+        return rows
+
+    def fetch_page(self, limit):
+        """ขอ record ถัดจาก cursor จาก store (เรียงจากใหม่ไปเก่าอยู่แล้ว) แล้วแปลงเป็น row
+
+        รวม occurrence ของกิจกรรมที่เกิดซ้ำเฉพาะช่วงเวลาของหน้านี้
+        (ตั้งแต่ record เก่าสุดของหน้า จนถึงช่วงที่โหลดไว้แล้ว)
+        """
+        store = get_store()
+        records = store.timeline_page(after=self._cursor, limit=limit)
+        self._exhausted = len(records) < limit
+        rows = [self.row_for(record) for record in records]
+        if records:
+            self._cursor = store.timeline_key(records[-1])
+            self._last_key = rows[-1]["sort_key"]
+
+        start = datetime.min if self._exhausted else (records[-1].due or datetime.min)
+        if start < self._window_start:
+            occurrences = store.occurrences(start, self._window_start)
+            if occurrences:
+                rows.extend(self.row_for(o) for o in occurrences)
+                rows.sort(key=lambda row: row["sort_key"], reverse=True)
+            self._window_start = start
+        return rows
+
+    def on_list_scroll(self, rv, scroll_y):
+        previous, self._scroll_y = self._scroll_y, scroll_y
+        if not self._built or self._browse_rows is not None:
+            return
+        # scroll_y = 1 คือบนสุด 0 คือท้ายรายการ โหลดเพิ่มเฉพาะด้านที่กำลังเลื่อนเข้าไปหา
+        hidden = rv.layout_manager.height - rv.height
+        if hidden <= 0:
+            return
+        if scroll_y < previous and scroll_y * hidden < LOAD_MORE_DISTANCE:
+            self.load_more()
+        elif scroll_y > previous and (1 - scroll_y) * hidden < LOAD_MORE_DISTANCE:
+            self.load_newer()
+
+    def row_for(self, record):
+        """แปลง Record เป็น row สำหรับ EventCard
+
+        การ์ดทุกใบสูงเท่ากัน (default_size ใน kv) RecycleView จึงไม่ต้องวัดขนาดทีละ row
+        และแก้ row ในที่ได้โดยไม่ต้องจัด layout ใหม่ทั้งรายการ
+        """
+        due = record.due
+
+        # วันที่และเวลา
+        dt_text = record.date
+        if record.time:
+            dt_text += f" {record.time}"
+
+        return {
+            "record_id": record.id,
+            "title": record.title,
+            "date_text": dt_text,
+            "details": record.details,
+            "due": due,
+            "done": record.done,
+            "series": isinstance(record, Occurrence) or record.repeat is not None,
+            "sort_key": (due is not None, due or datetime.min, record.id),
+        }
+
+    # ------------------ Search ------------------
+    def prepare_search(self):
+        """สร้าง index ตอนผู้ใช้แตะช่องค้นหา ตัวอักษรแรกที่พิมพ์จะได้ผลทันที"""
+        get_search_index()
+
+    def on_search_text(self, text):
+        # พิมพ์หลายตัวในเฟรมเดียวค้นแค่ครั้งเดียว
+        self._query = text.strip()
+        self._search_trigger()
+
+    @profiled("event.search")
+    def run_search(self, *args):
+        rv = self.ids.event_list
+        if not self._query:
+            if self._browse_rows is not None:
+                rv.data = self._browse_rows
+                self._browse_rows = None
+            return
+        if self._browse_rows is None:
+            self._browse_rows = list(rv.data)
+        store = get_store()
+        now = datetime.now()
+        rows = []
+        for record_id in get_search_index().search(self._query, SEARCH_LIMIT):
+            record = store.get(record_id)
+            if record.repeat is not None:
+                # แสดงเป็นครั้งที่ใกล้ที่สุด Done / Delete จึงทำงานเหมือนการ์ดในรายการปกติ
+                record = nearest_occurrence(record, now) or record
+            rows.append(self.row_for(record))
+        rv.data = rows
+        rv.scroll_y = 1
+
+    # ------------------ Import / Export ------------------
+    def open_import(self):
+        """เลือกไฟล์ .csv / .ics แล้วนำเข้าทีละ batch"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.filechooser import FileChooserListView
+
+        chooser = FileChooserListView(
+            path=os.path.expanduser("~"), filters=["*.csv", "*.ics", "*.CSV", "*.ICS"]
+        )
+        popup = Popup(title="Import events (CSV / iCalendar)", content=chooser, size_hint=(0.9, 0.9))
+
+        def chosen(_, selection, *args):
+            if selection:
+                popup.dismiss()
+                self.run_transfer(import_events(get_store(), selection[0]), "Imported")
+
+        chooser.bind(on_submit=chosen)
+        popup.open()
+
+    def export(self, extension):
+        path = export_path(extension)
+        self.run_transfer(export_events(get_store(), path), f"Exported to {path}:")
+
+    def run_transfer(self, job, verb):
+        """ทำงานของ generator ทีละ batch ต่อเฟรม UI จึงไม่ค้างระหว่างนำเข้า / ส่งออก"""
+        if self._transfer is not None:
+            return
+        self._transfer = Clock.schedule_interval(partial(self._transfer_step, job, verb), 0)
+
+    def _transfer_step(self, job, verb, dt):
+        """หนึ่ง batch ต่อเฟรม งานจบเสมอเมื่อเสร็จหรือพัง (ข้อผิดพลาดอื่นก็ไม่ทิ้งงานค้างไว้)"""
+        running = False
+        # ถ้าพังด้วยข้อผิดพลาดที่ไม่ได้คาดไว้ ข้อความความคืบหน้าจะถูกล้าง
+        text = ""
+        try:
+            progress = next(job)
+            text = f"{verb} {progress.done} events"
+            if progress.skipped:
+                text += f", {progress.skipped} skipped"
+            if progress.fraction != 1.0:
+                if progress.fraction is not None:
+                    text += f" ({progress.fraction:.0%})"
+                text += " ..."
+                running = True
+        except TRANSFER_ERRORS as e:
+            Logger.warning(f"Transfer: {e}")
+            text = f"Failed: {e}"
+        finally:
+            self.ids.transfer_status.text = text
+            if not running:
+                # close() ให้ finally ของ generator ลบไฟล์ชั่วคราวของการส่งออกที่ค้างอยู่
+                job.close()
+                self._transfer.cancel()
+                self._transfer = None
+        return running
+
+    # ------------------ Archive ------------------
+    def open_archive(self):
+        """หน้าต่างกิจกรรมที่เก็บถาวร เปิดไฟล์ของปีที่เลือกเมื่อถูกเลือกเท่านั้น"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.spinner import Spinner
+        from kivy.uix.label import Label
+        from kivy.uix.recycleview import RecycleView
+        from kivy.uix.recycleboxlayout import RecycleBoxLayout
+
+        years = [str(year) for year in archive.archive_years()]
+        layout = BoxLayout(orientation="vertical", spacing=dp(10), padding=dp(10))
+        year_input = Spinner(
+            text=years[0] if years else "No archived events",
+            values=years,
+            disabled=not years,
+            size_hint_y=None,
+            height=dp(40),
+        )
+        rv = RecycleView(do_scroll_x=False)
+        rv.add_widget(
+            RecycleBoxLayout(
+                orientation="vertical",
+                spacing=dp(8),
+                default_size=(None, dp(48)),
+                default_size_hint=(1, None),
                 size_hint_y=None,
-                height=dp(18),
+                height=0,
             )
-            card.add_widget(dt_label)
-
-            # รายละเอียด
-            if ev.get("details"):
-                det_label = Label(
-                    text=ev["details"],
-                    font_size=dp(11),
-                    color=(0.3, 0.3, 0.3, 1),
-                    size_hint_y=None,
-                    height=dp(18),
-                )
-                card.add_widget(det_label)
-
-            # ปุ่มทำเสร็จ / ลบ
-            actions = BoxLayout(size_hint_y=None, height=dp(35), spacing=dp(8))
-
-            # Done / Undo
-            done_btn = Button(
-                text="Done" if not ev["done"] else "Undo",
-                background_normal="",
-                background_color=(
-                    (0.3, 0.7, 0.4, 1) if not ev["done"] else (0.9, 0.9, 0.9, 1)
-                ),
-                color=(1, 1, 1, 1) if not ev["done"] else (0, 0, 0, 1),
-            )
-            done_btn.bind(on_press=lambda btn, i=idx: self.mark_done(i))
-            actions.add_widget(done_btn)
-
-            # Delete
-            del_btn = Button(
-                text="Delete",
-                background_normal="",
-                background_color=(0.88, 0.43, 0.45, 1),
-                color=(1, 1, 1, 1),
-            )
-            del_btn.bind(on_press=lambda btn, i=idx: self.delete_event(i))
-            actions.add_widget(del_btn)
-
-            card.add_widget(actions)
-            container.add_widget(card)
-
-        # ป้องกันปัญหาความสูงทับกัน
-        total_height = sum([child.height for child in container.children]) + dp(
-            8
-        ) * len(container.children)
-        container.height = total_height
-
-        # เก็บ combined events สำหรับ callback
-        self._combined_events = combined
-
-    def mark_done(self, index):
-        combined = self._combined_events
-        item = combined[index]
-        data = load_data()
+        )
+        rv.layout_manager.bind(minimum_height=rv.layout_manager.setter("height"))
+        # viewclass ต้องตั้งหลังจากมี layout แล้ว (RecycleView ส่งต่อค่าให้ layout ตอนตั้งค่า)
+        rv.viewclass = "ArchivedCard"
+        layout.add_widget(year_input)
+        layout.add_widget(rv)
+        if not years:
+            layout.add_widget(Label(text=f"Events are archived {archive.ARCHIVE_DAYS} days after they pass."))
+
+        popup = Popup(title="Archived events", content=layout, size_hint=(0.9, 0.9))
+        self._archive_list = rv
+        popup.bind(on_dismiss=lambda *args: setattr(self, "_archive_list", None))
+        year_input.bind(text=lambda spinner, text: self.show_archive_year(int(text)))
+        if years:
+            self.show_archive_year(int(years[0]))
+        popup.open()
+
+    def show_archive_year(self, year):
+        self._archive_year = year
+        self._archive_list.data = [
+            {
+                "record_id": record.id,
+                "title": record.title,
+                "date_text": f"{record.date} {record.time}".strip(),
+                "done": record.done,
+            }
+            for record in archive.load_year(year)
+        ]
+
+    def restore_archived(self, record_id):
+        # store แจ้งกลับผ่าน on_store_change ให้เพิ่มการ์ดในรายการหลัก
+        archive.restore(get_store(), self._archive_year, [record_id])
+        rows = self._archive_list.data
+        self._archive_list.data = [row for row in rows if row["record_id"] != record_id]
+
+    def rows(self):
+        """row ของรายการปกติ (ไม่ใช่ผลการค้นหา)"""
+        if self._browse_rows is not None:
+            return self._browse_rows
+        return self.ids.event_list.data
+
+    # ------------------ Incremental updates ------------------
+    def on_store_change(self, op, record):
+        if not self._built:
+            return
+        if self._browse_rows is not None:
+            # ผลการค้นหาอาจเปลี่ยน ค้นใหม่ในเฟรมถัดไป (index อัปเดตแล้ว)
+            self._search_trigger()
+        if op == "add_many":
+            self.add_rows(record)
+            return
+        if record.repeat is not None:
+            self.sync_occurrences(op, record)
+            return
+        rows = self.rows()
+        index = self.row_index(record.id)
+        if op == "delete":
+            if index is not None:
+                self.remove_row(index)
+            return
 
-        if item["is_task"]:
-            data["tasks"][index]["done"] = not data["tasks"][index]["done"]
+        row = self.row_for(record)
+        # record ที่อยู่นอกช่วงที่โหลดมาแล้ว (เก่ากว่า / ใหม่กว่า) จะมากับหน้าถัดไปเอง
+        loaded = self.is_loaded(row["sort_key"])
+        if index is None:
+            if loaded:
+                self.insert_row(row)
+        elif not loaded:
+            self.remove_row(index)
+        elif row["sort_key"] == rows[index]["sort_key"]:
+            self.update_row(index, row)
         else:
-            for i, e in enumerate(data.get("events", [])):
-                if e["title"] == item["title"] and e["date"] == item["date"]:
-                    data["events"][i]["done"] = not data["events"][i]["done"]
-                    break
-
-        save_data(data)
-        self.refresh_events()
-
-    def delete_event(self, index):
-        combined = self._combined_events
-        item = combined[index]
-        data = load_data()
+            # วันที่ถูกแก้ไข ย้ายการ์ดไปตำแหน่งใหม่
+            self.remove_row(index)
+            self.insert_row(row)
+
+    def sync_occurrences(self, op, record):
+        """แทน occurrence ของกิจกรรมที่เกิดซ้ำนี้ในช่วงที่โหลดแล้วด้วยชุดใหม่"""
+        prefix = f"{record.id}@"
+        old_ids = {record_id for record_id in self._keys if record_id.startswith(prefix)}
+        fresh = []
+        if op != "delete":
+            fresh = [self.row_for(o) for o in expand(record, self._window_start, self._window_end)]
+        if not old_ids and not fresh:
+            return
+        if len(fresh) == len(old_ids) and all(self._keys.get(row["record_id"]) == row["sort_key"] for row in fresh):
+            # วันเดิมทั้งหมด เปลี่ยนแค่สถานะ / ข้อความ (เช่นทำเสร็จหนึ่งครั้ง) แก้การ์ดในที่
+            for row in fresh:
+                self.update_row(self.row_index(row["record_id"]), row)
+            return
 
-        if item["is_task"]:
-            del data["tasks"][index]
+        for record_id in old_ids:
+            del self._keys[record_id]
+        self.merge_rows([row for row in self.rows() if row["record_id"] not in old_ids], fresh)
+
+    def add_rows(self, records):
+        """record ที่นำเข้าทั้ง batch: เพิ่มเฉพาะที่อยู่ในช่วงที่โหลดแล้ว จัด layout ครั้งเดียว"""
+        fresh = []
+        for record in records:
+            if record.repeat is not None:
+                fresh.extend(self.row_for(o) for o in expand(record, self._window_start, self._window_end))
+            else:
+                row = self.row_for(record)
+                if self.is_loaded(row["sort_key"]):
+                    fresh.append(row)
+        if fresh:
+            self.merge_rows(list(self.rows()), fresh)
+
+    def merge_rows(self, kept, fresh):
+        """รวม row ใหม่เข้ากับรายการเดิม แล้วแทนทั้งรายการในครั้งเดียว"""
+        # รายการที่เรียงอยู่แล้วเกือบทั้งหมด sort จึงเร็ว
+        kept.extend(fresh)
+        kept.sort(key=lambda row: row["sort_key"], reverse=True)
+        if self._browse_rows is not None:
+            self._browse_rows = kept
         else:
-            for i, e in enumerate(data.get("events", [])):
-                if e["title"] == item["title"] and e["date"] == item["date"]:
-                    del data["events"][i]
-                    break
-
-        save_data(data)
-        self.refresh_events()
+            self.ids.event_list.data = kept
+        self.remember(fresh)
+
+    def is_loaded(self, key):
+        """sort_key นี้อยู่ในช่วงที่โหลดมาแล้วหรือไม่ (นอกช่วงจะมากับหน้าถัดไปเอง)"""
+        return (self._exhausted or key >= self._last_key) and (self._top_reached or key <= self._first_key)
+
+    def remember(self, rows):
+        for row in rows:
+            self._keys[row["record_id"]] = row["sort_key"]
+
+    def row_index(self, record_id):
+        """ตำแหน่งของ row ของ record นี้ใน rows() (None ถ้าไม่ได้โหลดไว้)"""
+        key = self._keys.get(record_id)
+        if key is None:
+            return None
+        return self.insert_position(key)
+
+    def insert_row(self, row):
+        index = self.insert_position(row["sort_key"])
+        self.rows().insert(index, row)
+        self._keys[row["record_id"]] = row["sort_key"]
+
+    def remove_row(self, index):
+        rows = self.rows()
+        del self._keys[rows[index]["record_id"]]
+        del rows[index]
+
+    def update_row(self, index, row):
+        """แก้ row เดิมในที่ แล้ววาดใหม่เฉพาะการ์ดใบนั้นถ้ากำลังแสดงอยู่
+
+        ไม่ผ่าน data[index] = row เพราะ RecycleView จะจัด layout ใหม่ทั้งรายการ
+        (ขนาดการ์ดเท่าเดิม ตำแหน่งไม่เปลี่ยน จึงไม่จำเป็น)
+        """
+        rows = self.rows()
+        rows[index].update(row)
+        if rows is self._browse_rows:
+            return
+        rv = self.ids.event_list
+        view = rv.view_adapter.get_visible_view(index)
+        if view is not None:
+            view.refresh_view_attrs(rv, index, rows[index])
+
+    def insert_position(self, sort_key):
+        """ค้นหาแบบ binary search ในรายการที่เรียงวันที่จากใหม่ไปเก่า (ตำแหน่งของ row ที่มี sort_key นี้ ถ้ามี)"""
+        rows = self.rows()
+        lo, hi = 0, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if rows[mid]["sort_key"] > sort_key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def mark_done(self, record_id):
+        # store แจ้งกลับผ่าน on_store_change ให้อัปเดตเฉพาะการ์ดใบนี้
+        occurrence = split_occurrence_id(record_id)
+        if occurrence is not None:
+            get_store().toggle_occurrence(*occurrence)
+        elif get_store().get(record_id).repeat is not None:
+            # ชุดที่ไม่มีครั้งไหนให้แสดงแล้ว เหลือแค่ตัวเลือกของทั้งชุด
+            self.open_series_actions(record_id)
+        else:
+            get_store().toggle_done(record_id)
+
+    def delete_event(self, record_id):
+        # ลบกิจกรรมที่เกิดซ้ำทีละครั้ง ครั้งอื่นของชุดยังอยู่ (ลบทั้งชุดผ่านปุ่ม Series)
+        occurrence = split_occurrence_id(record_id)
+        if occurrence is not None:
+            get_store().skip_occurrence(*occurrence)
+        elif get_store().get(record_id).repeat is not None:
+            self.open_series_actions(record_id)
+        else:
+            get_store().delete(record_id)
+
+    def open_series_actions(self, record_id):
+        """ตัวเลือกของกิจกรรมที่เกิดซ้ำทั้งชุด: จบหลังครั้งนี้ หรือลบทั้งชุด"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.button import Button
+        from kivy.uix.label import Label
+
+        store = get_store()
+        occurrence = split_occurrence_id(record_id)
+        series_id = occurrence[0] if occurrence is not None else record_id
+        series = store.get(series_id)
+
+        layout = BoxLayout(orientation="vertical", spacing=dp(10), padding=dp(10))
+        popup = Popup(title=f"Repeating: {series.title}", content=layout, size_hint=(0.8, 0.45))
+
+        def action(fn, *args):
+            def press(_):
+                popup.dismiss()
+                fn(*args)
+
+            return press
+
+        layout.add_widget(Label(text=f"Started {series.date}"))
+        if occurrence is not None:
+            end_btn = Button(text=f"End after {occurrence[1].isoformat()}", size_hint_y=None, height=dp(40))
+            end_btn.bind(on_press=action(store.end_series, *occurrence))
+            layout.add_widget(end_btn)
+        delete_btn = Button(
+            text="Delete whole series",
+            size_hint_y=None,
+            height=dp(40),
+            background_normal="",
+            background_color=(0.88, 0.43, 0.45, 1),
+        )
+        delete_btn.bind(on_press=action(store.delete, series_id))
+        cancel_btn = Button(text="Cancel", size_hint_y=None, height=dp(40))
+        cancel_btn.bind(on_press=popup.dismiss)
+        layout.add_widget(delete_btn)
+        layout.add_widget(cancel_btn)
+        popup.open()
@@ -1,6 +1,6 @@
-import os
-import json
-import shutil
+from functools import partial
+
+from kivy.logger import Logger
 from kivy.uix.screenmanager import Screen
 from kivy.uix.popup import Popup
 from kivy.uix.image import Image
@@ -9,111 +9,127 @@ from kivy.uix.button import Button
 from kivy.metrics import dp
 from kivy.graphics import Color, Rectangle
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
-DATA_PATH = os.path.join(DATA_DIR, "data.json")
-IMAGE_DIR = os.path.join(DATA_DIR, "images")
-
-
-def load_data():
-    """โหลดข้อมูลจาก data.json"""
-    if not os.path.exists(DATA_PATH):
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(DATA_PATH, "w", encoding="utf-8") as f:
-            json.dump({"tasks": [], "class_image": "", "events": []}, f)
-        return {"tasks": [], "class_image": "", "events": []}
-    try:
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        with open(DATA_PATH, "w", encoding="utf-8") as f:
-            json.dump({"tasks": [], "class_image": "", "events": []}, f)
-        return {"tasks": [], "class_image": "", "events": []}
+from services import profiling
+from services.texture_loader import get_texture_loader
+from storage.data_store import get_store
+from storage.image_store import asset_path, collect_garbage, import_image, release, remember, to_ref
+from storage.thumbnails import ensure_thumbnails, get_thumbnail
 
 
-def save_data(data):
-    """บันทึกข้อมูลลง data.json"""
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+def screen_thumbnail(path):
+    """สร้างรูปย่อทุกขนาดของรูปที่ apply แล้ว คืนรูปย่อขนาดหน้าจอ (รันบน worker)"""
+    ensure_thumbnails(path)
+    return get_thumbnail(path, "screen")
 
 
 class MyClassScreen(Screen):
     preview_path = ""  # path ของไฟล์ที่เลือกเพื่อ preview
+    full_path = ""  # path ของรูปต้นฉบับ (บนจอแสดงรูปย่อ ใช้รูปเต็มตอน fullscreen เท่านั้น)
+    _importing = 0  # จำนวนรูปที่ worker กำลังคัดลอก
 
     def on_enter(self):
-        data = load_data()
-        image_path = data.get("class_image", "")
-        if image_path and os.path.exists(image_path):
-            self.ids.class_image.source = image_path
+        # path ถูกตรวจไว้แล้วตอนเริ่มแอป (validate_assets) ไม่ต้อง stat ไฟล์ทุกครั้ง
+        image_path = asset_path(get_store().class_image)
+        if image_path:
+            self.full_path = image_path
+            self.show_image(image_path, lambda p: get_thumbnail(p, "screen"))
         else:
-            self.ids.class_image.source = ""
+            self.full_path = ""
+            self.show_image("")
         self.preview_path = ""
 
+    def show_image(self, path, prepare=None):
+        """แสดง placeholder ทันที แล้วให้ worker เตรียมรูปย่อและถอดรหัสเบื้องหลัง"""
+        image = self.ids.class_image
+        loader = get_texture_loader()
+        image.source = ""
+        if not path:
+            loader.cancel("class_image")
+            image.texture = None
+            return
+        image.texture = loader.placeholder
+        # วัดตั้งแต่ขอจนได้ texture (ถ้าถูกยกเลิกกลางทาง span นี้จะไม่ถูกบันทึก)
+        span = profiling.span("myclass.load_image", path=path)
+
+        def loaded(texture):
+            span.finish()
+            self._set_class_texture(texture)
+
+        loader.request("class_image", path, loaded, prepare=prepare)
+
+    def _set_class_texture(self, texture):
+        self.ids.class_image.texture = texture
+
     def select_image(self, selection):
         """เลือกไฟล์แล้ว preview ทันที"""
         if not selection:
             return
         self.preview_path = selection[0]
-        self.ids.class_image.source = self.preview_path
-        self.ids.class_image.reload()
+        self.full_path = self.preview_path
+        # ถ้าเลือกไฟล์อื่นก่อนไฟล์นี้โหลดเสร็จ คำขอนี้จะถูกยกเลิกอัตโนมัติ
+        self.show_image(self.preview_path, lambda p: get_thumbnail(p, "preview"))
 
     def apply_image(self):
-        """บันทึกรูปลงโฟลเดอร์ images และอัปเดต data.json"""
-        if not self.preview_path:
-            return
-
-        os.makedirs(IMAGE_DIR, exist_ok=True)
-        filename = os.path.basename(self.preview_path)
-
-        # ป้องกันไฟล์ชื่อซ้ำ
-        new_path = os.path.join(IMAGE_DIR, filename)
-        counter = 1
-        while os.path.exists(new_path):
-            name, ext = os.path.splitext(filename)
-            new_path = os.path.join(IMAGE_DIR, f"{name}_{counter}{ext}")
-            counter += 1
+        """บันทึกรูปลงโฟลเดอร์ images และอัปเดต data.json
 
-        shutil.copy(self.preview_path, new_path)
-
-        data = load_data()
+        hash และคัดลอกไฟล์บน worker ระหว่างนั้นบนจอยังเป็นรูป preview
+        """
+        source = self.preview_path
+        if not source:
+            return
+        self.preview_path = ""
+        self._importing += 1
+        # เก็บรูปตาม hash ของเนื้อไฟล์ รูปเดียวกันที่เลือกซ้ำจะไม่ถูกคัดลอกอีก
+        get_texture_loader().run(partial(import_image, source), partial(self._image_imported, source))
+
+    def _image_imported(self, source, new_path):
+        self._importing -= 1
+        if new_path is None:
+            Logger.warning(f"MyClass: cannot save image {source}")
+            if not self.preview_path:
+                # ให้กด Apply ใหม่ได้
+                self.preview_path = source
+            return
+        new_ref = to_ref(new_path)
+        remember(new_ref, new_path)
 
-        # ลบรูปเก่า
-        old_image = data.get("class_image")
-        if old_image and os.path.exists(old_image):
-            try:
-                os.remove(old_image)
-            except Exception:
-                pass
+        store = get_store()
+        old_image = store.class_image
+        store.set_class_image(new_ref)
 
-        data["class_image"] = new_path
-        save_data(data)
+        # ลบรูปเก่าเฉพาะเมื่อไม่มีข้อมูลไหนอ้างถึงแล้ว
+        if old_image:
+            release(old_image)
+        self._collect_garbage()
 
-        self.ids.class_image.source = new_path
-        self.ids.class_image.reload()
-        self.preview_path = ""
+        if self.preview_path:
+            # ผู้ใช้เลือกรูปอื่นมา preview ระหว่างคัดลอก ไม่แทนที่ preview นั้น
+            return
+        self.full_path = new_path
+        self.show_image(new_path, screen_thumbnail)
 
     def delete_image(self):
         """ลบรูปที่บันทึกไว้"""
-        data = load_data()
-        image_path = data.get("class_image")
-
-        if image_path and os.path.exists(image_path):
-            try:
-                os.remove(image_path)
-            except Exception:
-                pass
+        store = get_store()
+        image_path = store.class_image
+        store.set_class_image("")
 
-        data["class_image"] = ""
-        save_data(data)
+        if image_path:
+            release(image_path)
+        self._collect_garbage()
 
-        self.ids.class_image.source = ""
-        self.ids.class_image.reload()
+        self.full_path = ""
+        self.show_image("")
         self.preview_path = ""
 
+    def _collect_garbage(self):
+        # รูปที่ worker คัดลอกเสร็จแล้วยังไม่มีใครอ้างถึงจนกว่าจะถึง _image_imported ของมัน
+        if not self._importing:
+            collect_garbage()
+
     # ------------------ 🔥 Zoom Fullscreen ------------------
     def open_fullscreen(self):
-        image_path = self.ids.class_image.source
+        image_path = self.full_path
         if not image_path:
             return
 
@@ -126,8 +142,18 @@ class MyClassScreen(Screen):
             self.bg_rect = Rectangle(size=layout.size, pos=layout.pos)
         layout.bind(size=self._update_rect, pos=self._update_rect)
 
-        # Image
-        full_image = Image(source=image_path, allow_stretch=True, keep_ratio=True)
+        # Image: แสดงรูปย่อที่อยู่บนจออยู่แล้วทันที แล้วสลับเป็นรูปเต็มเมื่อโหลดเสร็จ
+        # (ใช้ texture ที่เคยโหลดไว้ถ้ามี รูปย่อยังไม่มาก็แสดง placeholder)
+        loader = get_texture_loader()
+        thumbnail = self.ids.class_image.texture or loader.placeholder
+        full_image = Image(texture=thumbnail, allow_stretch=True, keep_ratio=True)
+        span = profiling.span("myclass.load_fullscreen", path=image_path)
+
+        def loaded(texture):
+            span.finish()
+            full_image.texture = texture
+
+        loader.request("fullscreen", image_path, loaded)
         layout.add_widget(full_image)
 
         # ปุ่ม X มุมบน
@@ -144,6 +170,7 @@ class MyClassScreen(Screen):
             content=layout, size_hint=(1, 1), auto_dismiss=True, background=""
         )
         close_btn.bind(on_press=popup.dismiss)
+        popup.bind(on_dismiss=lambda *args: loader.cancel("fullscreen"))
         layout.add_widget(close_btn)
 
         popup.open()
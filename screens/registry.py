@@ -0,0 +1,111 @@
+import os
+import importlib
+import time
+
+from kivy.clock import Clock
+from kivy.lang import Builder
+from kivy.logger import Logger
+from kivy.uix.screenmanager import ScreenManager
+
+from services import profiling
+from services.startup import get_startup_timer
+
+KV_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "kv")
+
+# ชื่อหน้าจอ -> (module, ชื่อคลาส, ไฟล์ kv) ยังไม่ import / โหลดจนกว่าจะถูกใช้
+SCREENS = {
+    "home": ("screens.home_screen", "HomeScreen", "home.kv"),
+    "myclass": ("screens.myclass_screen", "MyClassScreen", "myclass.kv"),
+    "calendar": ("screens.calendar_screen", "CalendarScreen", "calendar.kv"),
+    "event": ("screens.event_screen", "EventScreen", "event.kv"),
+}
+
+# หน้าจอที่ผู้ใช้น่าจะไปต่อจากหน้าปัจจุบัน เตรียมไว้ล่วงหน้าตอนแอปว่าง
+PREFETCH = {
+    "home": "event",
+    "myclass": "event",
+    "calendar": "event",
+    "event": "calendar",
+}
+# รอให้ transition เปลี่ยนหน้าจบก่อนค่อยเริ่ม prefetch
+PREFETCH_DELAY = 1.0
+
+
+class LazyScreenManager(ScreenManager):
+    """ScreenManager ที่สร้างหน้าจอตอนถูกเรียกใช้ครั้งแรก
+
+    ขั้นตอน import module, โหลดไฟล์ kv และสร้าง widget ทำเมื่อเปลี่ยนไปหน้านั้น
+    (หรือ get_screen) ครั้งแรก ส่วน prefetch ทำทีละขั้นต่อหนึ่งเฟรม
+    จะได้ไม่กระตุกตอนผู้ใช้กำลังใช้งานหน้าปัจจุบัน
+    """
+
+    def __init__(self, prefetch=True, **kwargs):
+        self._classes = {}  # ชื่อหน้าจอ -> คลาสที่ import แล้ว
+        self._kv_loaded = set()
+        self._prefetch_name = None
+        self._prefetch_event = Clock.create_trigger(self._prefetch_step, PREFETCH_DELAY)
+        super().__init__(**kwargs)
+        if prefetch:
+            self.bind(current=self._schedule_prefetch)
+
+    def on_current(self, instance, value):
+        # เวลาเปลี่ยนหน้า (รวมการสร้างหน้าจอครั้งแรกและ on_pre_enter) ไม่รวม animation
+        with profiling.span("navigate", screen=value):
+            super().on_current(instance, value)
+
+    def get_screen(self, name):
+        if name in SCREENS and not super().has_screen(name):
+            return self.build_screen(name)
+        return super().get_screen(name)
+
+    def has_screen(self, name):
+        return name in SCREENS or super().has_screen(name)
+
+    def build_screen(self, name):
+        start = time.perf_counter()
+        with profiling.span("screen.build", screen=name):
+            cls = self._import(name)
+            self._load_kv(name)
+            with get_startup_timer().phase(f"build {name}"):
+                screen = cls(name=name)
+        self.add_widget(screen)
+        Logger.debug(f"Screens: {name} ready in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return screen
+
+    def _import(self, name):
+        cls = self._classes.get(name)
+        if cls is None:
+            module, class_name, _ = SCREENS[name]
+            with get_startup_timer().phase(f"import {name}"):
+                cls = getattr(importlib.import_module(module), class_name)
+            self._classes[name] = cls
+        return cls
+
+    def _load_kv(self, name):
+        if name not in self._kv_loaded:
+            with get_startup_timer().phase(f"kv {name}"):
+                Builder.load_file(os.path.join(KV_DIR, SCREENS[name][2]))
+            self._kv_loaded.add(name)
+
+    # ------------------ Prefetch ------------------
+    def _schedule_prefetch(self, instance, current):
+        self._prefetch_event.cancel()
+        self._prefetch_name = PREFETCH.get(current)
+        if self._prefetch_name and not super().has_screen(self._prefetch_name):
+            self._prefetch_event.timeout = PREFETCH_DELAY
+            self._prefetch_event()
+
+    def _prefetch_step(self, dt):
+        name = self._prefetch_name
+        if name is None or super().has_screen(name):
+            return
+        if name not in self._classes:
+            self._import(name)
+        elif name not in self._kv_loaded:
+            self._load_kv(name)
+        else:
+            self.build_screen(name)
+            return
+        # ขั้นถัดไปทำในเฟรมหน้า
+        self._prefetch_event.timeout = 0
+        self._prefetch_event()
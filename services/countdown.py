@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from kivy.clock import Clock
+
+HOUR = 3600
+# ตั้งเวลาให้เลยจุดเปลี่ยนชั่วโมงไปเล็กน้อย กันปัดเศษแล้วยังได้ค่าเดิม
+TICK_SLACK = 0.05
+PASSED = "Passed"
+
+
+def countdown_text(due, now):
+    """ข้อความ "X D Y H Left" / "Passed" ของกิจกรรมที่ครบกำหนดเวลา due"""
+    if due is None:
+        return ""
+    total_seconds = int((due - now).total_seconds())
+    if total_seconds > 0:
+        days = total_seconds // (24 * HOUR)
+        hours = (total_seconds % (24 * HOUR)) // HOUR
+        return f"{days} D {hours} H Left"
+    return PASSED
+
+
+class CountdownTicker:
+    """นาฬิกาตัวเดียวสำหรับอัปเดตเวลาที่เหลือของการ์ดที่มองเห็นอยู่
+
+    ไม่ได้ poll เป็นช่วง ๆ แต่คำนวณว่าการ์ดใบไหนจะเปลี่ยนตัวเลขชั่วโมงเร็วที่สุด
+    แล้วตั้ง Clock ไว้ที่เวลานั้นครั้งเดียว หยุดทำงานเมื่อ stop() ถูกเรียก
+    """
+
+    def __init__(self):
+        self._event = Clock.create_trigger(self.tick)
+        self._views_fn = None
+        self._next_at = None
+
+    @property
+    def running(self):
+        return self._views_fn is not None
+
+    def start(self, views_fn):
+        """views_fn() คืนการ์ดที่มองเห็นอยู่ (ต้องมี due และ update_countdown)"""
+        self._views_fn = views_fn
+        self.tick()
+
+    def stop(self):
+        self._views_fn = None
+        self._event.cancel()
+        self._next_at = None
+
+    def tick(self, *args):
+        if self._views_fn is None:
+            return
+        self._event.cancel()
+        self._next_at = None
+        now = datetime.now()
+        for view in self._views_fn():
+            # การ์ดที่แสดง Passed แล้วไม่มีอะไรเปลี่ยนอีก
+            if view.due is None or view.countdown == PASSED:
+                continue
+            view.update_countdown(now)
+            self.consider(view.due, now)
+
+    def consider(self, due, now=None):
+        """เลื่อนเวลา tick ถัดไปให้เร็วขึ้นถ้า due จะเปลี่ยนตัวเลขก่อน"""
+        if self._views_fn is None or due is None:
+            return
+        now = now or datetime.now()
+        remaining = (due - now).total_seconds()
+        if remaining <= 0:
+            return
+        wait = (remaining % HOUR or HOUR) + TICK_SLACK
+        at = now + timedelta(seconds=wait)
+        if self._next_at is None or at < self._next_at:
+            self._next_at = at
+            self._event.cancel()
+            self._event.timeout = wait
+            self._event()
+
+
+_ticker = None
+
+
+def get_ticker() -> CountdownTicker:
+    global _ticker
+    if _ticker is None:
+        _ticker = CountdownTicker()
+    return _ticker
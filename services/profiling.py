@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import threading
+import functools
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+
+# เปิดด้วย STUDENT_LIFE_PROFILE=1 ปิดอยู่จะไม่มีค่าใช้จ่ายเพิ่มกับโค้ดที่ถูกวัด
+ENABLED = os.environ.get("STUDENT_LIFE_PROFILE", "") not in ("", "0")
+# ไฟล์ trace รูปแบบ Chrome Trace Event เปิดดูได้ใน chrome://tracing หรือ ui.perfetto.dev
+TRACE_PATH = os.environ.get("STUDENT_LIFE_TRACE") or os.path.join(BASE_DIR, "data", "cache", "trace.json")
+
+_lock = threading.Lock()
+_counters = {"widgets": 0, "json_read": 0, "json_written": 0}
+_events = []
+_origin = time.perf_counter()
+
+
+def add(counter, amount=1):
+    """เพิ่มตัวนับ (เช่น จำนวน byte ของ JSON ที่อ่าน/เขียน) เรียกจาก thread ไหนก็ได้"""
+    if ENABLED:
+        with _lock:
+            _counters[counter] += amount
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+class Span:
+    """ช่วงเวลาหนึ่งที่ถูกวัด: เวลา, widget ที่สร้าง และ JSON ที่อ่าน/เขียนระหว่างช่วง
+
+    ใช้เป็น context manager หรือเรียก finish() เองสำหรับงานที่จบใน callback
+    """
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.tid = threading.get_ident()
+        self.before = counters()
+        self.start = time.perf_counter()
+
+    def finish(self, **args):
+        if self.start is None:
+            return
+        duration = time.perf_counter() - self.start
+        after = counters()
+        args = {**self.args, **args}
+        for key, value in after.items():
+            args[key] = value - self.before[key]
+        with _lock:
+            _events.append(
+                {
+                    "name": self.name,
+                    "ph": "X",
+                    "ts": (self.start - _origin) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": os.getpid(),
+                    "tid": self.tid,
+                    "args": args,
+                }
+            )
+        self.start = None
+        Logger.info(
+            f"Profile: {self.name} {duration * 1000:.1f} ms, {args['widgets']} widgets, "
+            f"{args['json_read']} B read, {args['json_written']} B written"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+
+
+class _NullSpan:
+    def finish(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **args):
+    return Span(name, args) if ENABLED else _NULL_SPAN
+
+
+def profiled(name):
+    """decorator วัดเวลาของเมธอด ถ้าไม่ได้เปิด profiling จะคืนฟังก์ชันเดิม"""
+
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def install():
+    """เริ่มนับจำนวน widget ที่ถูกสร้าง (เรียกครั้งเดียวก่อนสร้างหน้าจอ)"""
+    if not ENABLED:
+        return
+    from kivy.uix.widget import Widget
+
+    if getattr(Widget.__init__, "_profiled", False):
+        return
+    original = Widget.__init__
+
+    @functools.wraps(original)
+    def counting_init(self, **kwargs):
+        add("widgets")
+        original(self, **kwargs)
+
+    counting_init._profiled = True
+    Widget.__init__ = counting_init
+    Logger.info(f"Profile: enabled, trace will be written to {TRACE_PATH}")
+
+
+def dump(path=None):
+    """เขียน span ทั้งหมดเป็นไฟล์ trace คืน path ของไฟล์ (None ถ้าไม่ได้เปิด profiling)"""
+    if not ENABLED:
+        return None
+    path = path or TRACE_PATH
+    with _lock:
+        events = list(_events)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    os.replace(path + ".tmp", path)
+    Logger.info(f"Profile: wrote {len(events)} spans to {path}")
+    return path
+
+
+class FrameTimeOverlay:
+    """ตัวเลขเวลาต่อเฟรม (เฉลี่ย / สูงสุด) มุมบนซ้ายของหน้าต่าง อัปเดตทุกครึ่งวินาที"""
+
+    def __init__(self):
+        from kivy.core.window import Window
+        from kivy.metrics import dp
+        from kivy.uix.label import Label
+
+        self.label = Label(
+            size_hint=(None, None),
+            size=(dp(170), dp(24)),
+            font_size=dp(12),
+            color=(0, 0.6, 0, 1),
+        )
+        self._frames = []
+        Window.bind(size=self._place)
+        Window.add_widget(self.label)
+        self._place(Window, Window.size)
+        Clock.schedule_interval(self._frame, 0)
+        Clock.schedule_interval(self._update, 0.5)
+
+    def _place(self, window, size):
+        self.label.pos = (0, size[1] - self.label.height)
+
+    def _frame(self, dt):
+        self._frames.append(dt)
+
+    def _update(self, dt):
+        frames, self._frames = self._frames, []
+        if frames:
+            average = sum(frames) / len(frames) * 1000
+            self.label.text = f"frame {average:.1f} ms (max {max(frames) * 1000:.1f})"
+
+
+def show_overlay():
+    if ENABLED:
+        return FrameTimeOverlay()
+    return None
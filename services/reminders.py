@@ -0,0 +1,238 @@
+import heapq
+from datetime import datetime, timedelta
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+from storage.data_store import get_store
+from storage.recurrence import UPCOMING_HORIZON, Occurrence, expand
+
+# เตือนก่อนถึงเวลากิจกรรมเท่านี้ ส่วนกิจกรรมที่ไม่มีเวลาเตือนตอน ALL_DAY_AT ของวันนั้น
+REMINDER_LEAD = timedelta(minutes=10)
+ALL_DAY_AT = timedelta(hours=8)
+# id ของ entry ใน heap ที่ขยาย occurrence ของช่วงถัดไป (record จริงไม่มี id ว่าง)
+REFILL_ID = ""
+# ขยายช่วงถัดไปก่อนถึงปลายช่วงเดิมเท่านี้ ให้ทันเตือน occurrence ต้นช่วงถัดไป
+REFILL_MARGIN = timedelta(days=1)
+
+
+def remind_at(record):
+    if record.time:
+        return record.due - REMINDER_LEAD
+    return record.due + ALL_DAY_AT
+
+
+def expired(record, now) -> bool:
+    """เลยเวลากิจกรรมไปแล้ว (กิจกรรมทั้งวันยังไม่หมดอายุจนกว่าจะขึ้นวันใหม่)"""
+    if record.time:
+        return record.due < now
+    return record.due.date() < now.date()
+
+
+class ReminderScheduler:
+    """แจ้งเตือนกิจกรรมที่ยังไม่เสร็จเมื่อใกล้ถึงเวลา
+
+    เก็บกิจกรรมที่รอแจ้งเตือนใน min-heap เรียงตามเวลาเตือน และตั้ง Clock ไว้ครั้งเดียว
+    สำหรับรายการที่ใกล้ที่สุดเท่านั้น การเพิ่ม / ทำเสร็จ / ลบ อัปเดตผ่าน listener ของ store
+    ใน O(log n): รายการที่ถูกยกเลิกไม่ถูกลบจาก heap ทันที แต่ถูกข้ามตอนขึ้นมาอยู่บนสุด
+    กิจกรรมที่เกิดซ้ำถูกขยายเป็น occurrence ล่วงหน้าไม่เกิน UPCOMING_HORIZON
+    และมี entry REFILL_ID ใน heap ใกล้ปลายช่วง ที่ขยายช่วงถัดไปเมื่อถึงเวลา (แอปที่เปิดค้างไว้นาน ๆ ไม่หยุดเตือน)
+    """
+
+    def __init__(self, store, on_due):
+        self.store = store
+        self.on_due = on_due  # on_due(records) เมื่อถึงเวลาเตือน
+        self._heap = []  # (เวลาเตือน, id)
+        self._pending = {}  # id -> (เวลาเตือน, record / occurrence) ของรายการที่ยังใช้ได้
+        self._series = {}  # id ของกิจกรรมที่เกิดซ้ำ -> id ของ occurrence ที่รออยู่
+        self._horizon = None  # ปลายช่วงที่ขยาย occurrence ไว้แล้ว
+        self._refill_at = None  # เวลาของ entry REFILL_ID ที่ยังใช้ได้
+        self._event = None
+        self._armed_at = None
+        self.running = False
+
+    def start(self):
+        """สร้าง heap จากกิจกรรมที่ยังไม่ถึงกำหนดครั้งเดียว แล้วฟังการเปลี่ยนแปลงต่อ"""
+        if self.running:
+            return
+        now = datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for record in self.store.pending_upcoming(today):
+            self._push(record, now)
+        heapq.heapify(self._heap)
+        # pending_upcoming ขยาย occurrence ไว้ถึงตรงนี้
+        self._horizon = today + UPCOMING_HORIZON
+        self._schedule_refill()
+        self.store.add_listener(self.on_store_change)
+        self.running = True
+        self._arm()
+        Logger.info(f"Reminders: {len(self._pending)} pending")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.store.remove_listener(self.on_store_change)
+        self.running = False
+        if self._event is not None:
+            self._event.cancel()
+        self._event = self._armed_at = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    # ------------------ Heap ------------------
+    def _push(self, record, now, keep_heap=False):
+        """เพิ่มลง heap (ตอน start ต่อท้ายก่อนแล้ว heapify ทีเดียว)"""
+        if record.done or record.due is None or expired(record, now):
+            return
+        at = remind_at(record)
+        self._pending[record.id] = (at, record)
+        if isinstance(record, Occurrence):
+            self._series.setdefault(record.series.id, set()).add(record.id)
+        if keep_heap:
+            heapq.heappush(self._heap, (at, record.id))
+        else:
+            self._heap.append((at, record.id))
+
+    def _discard(self, record_id):
+        entry = self._pending.pop(record_id, None)
+        if entry is not None and isinstance(entry[1], Occurrence):
+            self._series.get(entry[1].series.id, set()).discard(record_id)
+
+    def _peek(self):
+        """เวลาเตือนของรายการที่ใกล้ที่สุด (ทิ้งรายการที่ถูกยกเลิกไปแล้วที่อยู่บนสุด)"""
+        heap = self._heap
+        while heap:
+            at, record_id = heap[0]
+            if record_id == REFILL_ID:
+                if at == self._refill_at:
+                    return at
+            else:
+                entry = self._pending.get(record_id)
+                if entry is not None and entry[0] == at:
+                    return at
+            heapq.heappop(heap)
+        return None
+
+    def _schedule_refill(self):
+        self._refill_at = self._horizon - REFILL_MARGIN
+        heapq.heappush(self._heap, (self._refill_at, REFILL_ID))
+
+    def _refill(self, now):
+        """ขยาย occurrence ของทุกกิจกรรมที่เกิดซ้ำต่อจากปลายช่วงเดิม ไปจนถึง now + UPCOMING_HORIZON"""
+        start, self._horizon = self._horizon, now + UPCOMING_HORIZON
+        for record in self.store.recurring():
+            for occurrence in expand(record, start, self._horizon):
+                self._push(occurrence, now, keep_heap=True)
+        self._schedule_refill()
+
+    def _arm(self):
+        """ตั้ง Clock ไว้ที่รายการที่ใกล้ที่สุด (ตั้งใหม่เฉพาะเมื่อเวลาเปลี่ยน)"""
+        at = self._peek()
+        if at == self._armed_at:
+            return
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        self._armed_at = at
+        if at is not None:
+            delay = max(0, (at - datetime.now()).total_seconds())
+            self._event = Clock.schedule_once(self._fire, delay)
+
+    def _fire(self, dt):
+        self._event = self._armed_at = None
+        now = datetime.now()
+        due = []
+        while True:
+            at = self._peek()
+            # Clock อาจตื่นเร็วกว่ากำหนดเล็กน้อย (หรือช้ากว่ามากหลังเครื่อง sleep)
+            if at is None or at > now:
+                break
+            _, record_id = heapq.heappop(self._heap)
+            if record_id == REFILL_ID:
+                self._refill(now)
+                continue
+            due.append(self._pending[record_id][1])
+            self._discard(record_id)
+        self._arm()
+        if due:
+            self.on_due(due)
+
+    # ------------------ Store changes ------------------
+    def on_store_change(self, op, record):
+        now = datetime.now()
+        # นำเข้าทีละ batch: เพิ่มทั้งหมดก่อนแล้วตั้ง Clock ครั้งเดียว
+        for one in record if op == "add_many" else (record,):
+            self._apply_change(op, one, now)
+        self._arm()
+
+    def _apply_change(self, op, record, now):
+        if record.repeat is not None:
+            # ขยาย occurrence ของกิจกรรมนี้ใหม่ทั้งชุด (ชุดอื่นไม่เกี่ยว)
+            for occurrence_id in self._series.pop(record.id, ()):
+                self._pending.pop(occurrence_id, None)
+            if op != "delete":
+                for occurrence in expand(record, now, self._horizon):
+                    self._push(occurrence, now, keep_heap=True)
+        else:
+            self._discard(record.id)
+            if op != "delete":
+                self._push(record, now, keep_heap=True)
+
+
+_scheduler = None
+
+
+def get_reminders() -> ReminderScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ReminderScheduler(get_store(), show_alert)
+    return _scheduler
+
+
+class ReminderAlert:
+    """popup แจ้งเตือนในแอป ถ้ายังเปิดอยู่ตอนมีรายการใหม่จะต่อท้ายในหน้าต่างเดิม"""
+
+    def __init__(self):
+        from kivy.metrics import dp
+        from kivy.uix.boxlayout import BoxLayout
+        from kivy.uix.button import Button
+        from kivy.uix.label import Label
+        from kivy.uix.popup import Popup
+
+        layout = BoxLayout(orientation="vertical", spacing=dp(10), padding=dp(10))
+        self.label = Label(halign="center", valign="middle")
+        self.label.bind(size=lambda label, size: setattr(label, "text_size", size))
+        ok_btn = Button(text="OK", size_hint_y=None, height=dp(40))
+        layout.add_widget(self.label)
+        layout.add_widget(ok_btn)
+        self.popup = Popup(title="Reminder", content=layout, size_hint=(0.8, 0.4))
+        self.popup.bind(on_dismiss=self._closed)
+        ok_btn.bind(on_press=self.popup.dismiss)
+        self.lines = []
+        self.open = False
+
+    def show(self, records):
+        for record in records:
+            when = record.date + (f" {record.time}" if record.time else "")
+            self.lines.append(f"{record.title}  ({when})")
+        self.label.text = "\n".join(self.lines)
+        if not self.open:
+            self.open = True
+            self.popup.open()
+
+    def _closed(self, *args):
+        self.open = False
+        self.lines = []
+
+
+_alert = None
+
+
+def show_alert(records):
+    global _alert
+    for record in records:
+        Logger.info(f"Reminders: {record.title!r} due {record.date} {record.time}".rstrip())
+    if _alert is None:
+        _alert = ReminderAlert()
+    _alert.show(records)
@@ -0,0 +1,52 @@
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """จับเวลาแต่ละช่วงตอนเปิดแอป แล้วสรุปลง log ครั้งเดียวหลังวาดเฟรมแรก
+
+    ไม่ import kivy ในโมดูลนี้ เพื่อให้จับเวลาการ import kivy เองได้ด้วย
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []  # (ชื่อช่วง, วินาที) ตามลำดับที่เกิด
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        from kivy.logger import Logger
+
+        total = time.perf_counter() - self.started
+        for name, seconds in self.phases:
+            Logger.info(f"Startup: {name:<20} {seconds * 1000:8.1f} ms")
+        Logger.info(f"Startup: {'first frame':<20} {total * 1000:8.1f} ms")
+
+    def report_after_first_frame(self):
+        from kivy.core.window import Window
+
+        def flipped(*args):
+            Window.unbind(on_flip=flipped)
+            self.report()
+
+        Window.bind(on_flip=flipped)
+
+
+_timer = None
+
+
+def get_startup_timer() -> StartupTimer:
+    global _timer
+    if _timer is None:
+        _timer = StartupTimer()
+    return _timer
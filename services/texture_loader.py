@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+from kivy.loader import Loader
+from kivy.logger import Logger
+
+
+class TextureLoader:
+    """โหลดรูปเบื้องหลัง แล้วส่ง texture กลับมาบน UI thread
+
+    แต่ละ slot (เช่น "preview", "fullscreen") มีคำขอที่ยังมีผลได้แค่อันเดียว
+    ถ้าผู้ใช้เลือกรูปใหม่ก่อนรูปเดิมโหลดเสร็จ ผลของรูปเดิมจะถูกทิ้ง
+    texture ที่โหลดแล้วเก็บไว้ใช้ซ้ำ (LRU) ไม่ต้องถอดรหัสไฟล์เดิมอีก
+    """
+
+    def __init__(self, keep=4):
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._tickets = {}  # slot -> เลขคำขอล่าสุด
+        self._futures = {}  # slot -> งานที่ยังรออยู่ใน worker
+        self._textures = OrderedDict()  # path -> texture
+
+    @property
+    def placeholder(self):
+        return Loader.loading_image.texture
+
+    def cached(self, path):
+        texture = self._textures.get(path)
+        if texture is not None:
+            self._textures.move_to_end(path)
+        return texture
+
+    def cancel(self, slot):
+        self._tickets[slot] = self._tickets.get(slot, 0) + 1
+        future = self._futures.pop(slot, None)
+        if future is not None:
+            future.cancel()
+
+    def request(self, slot, source, callback, prepare=None):
+        """เรียก callback(texture) บน UI thread เมื่อโหลด source เสร็จ
+
+        prepare(source) -> path จะรันบน worker ก่อน (เช่น สร้างรูปย่อ)
+        """
+        self.cancel(slot)
+        ticket = self._tickets[slot]
+
+        def current():
+            return self._tickets.get(slot) == ticket
+
+        def finish(path, texture):
+            if texture is not None:
+                self._textures[path] = texture
+                self._textures.move_to_end(path)
+                while len(self._textures) > self.keep:
+                    self._textures.popitem(last=False)
+            if current():
+                callback(texture)
+
+        def decode(path):
+            if not current():
+                return
+            texture = self.cached(path)
+            if texture is not None:
+                callback(texture)
+                return
+            # Loader ถอดรหัสไฟล์บน thread ของตัวเอง แล้วสร้าง texture บน UI thread
+            proxy = Loader.image(path)
+            if proxy.loaded:
+                finish(path, proxy.texture)
+            else:
+                proxy.bind(on_load=lambda p: finish(path, p.texture))
+                proxy.bind(on_error=lambda p: current() and callback(Loader.error_image.texture))
+
+        if prepare is None:
+            decode(source)
+            return
+
+        future = self._executor.submit(prepare, source)
+        self._futures[slot] = future
+
+        def done(f):
+            if f.cancelled():
+                return
+            error = f.exception()
+            if error is None:
+                path = f.result()
+            else:
+                # เตรียมรูปไม่สำเร็จ (เช่น Pillow ไม่ยอมเปิดรูปที่ใหญ่ผิดปกติ) ใช้ไฟล์ต้นฉบับแทน
+                # ถ้าถอดรหัสไม่ได้อีก Loader จะแสดง error_image ให้เอง
+                Logger.warning(f"Textures: preparing {source} failed: {error!r}")
+                path = source
+            Clock.schedule_once(lambda dt: decode(path))
+
+        future.add_done_callback(done)
+
+    def run(self, fn, callback):
+        """รัน fn() บน worker เดียวกับการเตรียมรูป (งานไฟล์หนัก ๆ เช่น hash / คัดลอก)
+
+        แล้วเรียก callback(ผลลัพธ์) บน UI thread ถ้า fn ผิดพลาด callback ได้ None
+        """
+        future = self._executor.submit(fn)
+
+        def done(f):
+            error = f.exception()
+            if error is not None:
+                Logger.warning(f"Textures: background job failed: {error!r}")
+            result = None if error is not None else f.result()
+            Clock.schedule_once(lambda dt: callback(result))
+
+        future.add_done_callback(done)
+
+
+_loader = None
+
+
+def get_texture_loader() -> TextureLoader:
+    global _loader
+    if _loader is None:
+        _loader = TextureLoader()
+    return _loader
@@ -0,0 +1,125 @@
+import os
+import re
+import gzip
+import json
+from datetime import datetime, timedelta
+
+from kivy.logger import Logger
+
+from services import profiling
+from storage.data_store import DATA_DIR
+from storage.records import Record
+
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+# กิจกรรมที่เลยกำหนดมานานกว่านี้ (วัน) ถูกย้ายออกจาก data.json ไปเก็บถาวร (0 = ไม่ย้าย)
+ARCHIVE_DAYS = int(os.environ.get("STUDENT_LIFE_ARCHIVE_DAYS", "180"))
+ARCHIVE_FILE = re.compile(r"events-(\d{4})\.json\.gz$")
+
+
+def archive_path(year: int) -> str:
+    return os.path.join(ARCHIVE_DIR, f"events-{year}.json.gz")
+
+
+def archive_years() -> list:
+    """ปีที่มีไฟล์เก็บถาวร ใหม่สุดก่อน"""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    years = [int(m.group(1)) for m in map(ARCHIVE_FILE.match, os.listdir(ARCHIVE_DIR)) if m]
+    return sorted(years, reverse=True)
+
+
+def load_year(year: int) -> list:
+    """อ่านกิจกรรมที่เก็บถาวรของปีนี้ (เปิดไฟล์เฉพาะตอนถูกขอ) เรียงจากใหม่ไปเก่า"""
+    path = archive_path(year)
+    if not os.path.exists(path):
+        return []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = [Record.from_dict("events", data) for data in json.load(f)]
+    profiling.add("json_read", os.path.getsize(path))
+    records.sort(key=lambda r: (r.date, r.time, r.id), reverse=True)
+    return records
+
+
+def write_year(year: int, records: list):
+    """เขียนไฟล์ของปีนี้ใหม่ทั้งไฟล์ (ผ่านไฟล์ชั่วคราว) ลบไฟล์ทิ้งถ้าไม่เหลือกิจกรรม"""
+    path = archive_path(year)
+    if not records:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump([r.to_dict() for r in records], f, ensure_ascii=False)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    profiling.add("json_written", os.path.getsize(tmp_path))
+    os.replace(tmp_path, path)
+
+
+def archivable(store, cutoff: datetime) -> list:
+    """กิจกรรมที่ครบกำหนดก่อน cutoff (กิจกรรมที่เกิดซ้ำต้องสิ้นสุดก่อน cutoff) ยกเว้นที่เพิ่งกู้คืน"""
+    keep = set(store.archive_keep)
+    records = [r for r in store.events_before(cutoff) if r.id not in keep]
+    records.extend(
+        r
+        for r in store.recurring()
+        if r.due is not None and r.repeat.until is not None and r.repeat.until < cutoff.date() and r.id not in keep
+    )
+    return records
+
+
+def archive_old_events(store, now=None, days=None) -> int:
+    """ย้ายกิจกรรมที่เลยกำหนดมานานไปไว้ในไฟล์ gzip แยกตามปี คืนจำนวนที่ย้าย
+
+    เขียนไฟล์เก็บถาวรให้เสร็จก่อนแล้วจึงลบออกจาก store ถ้าแอปปิดกลางคัน
+    กิจกรรมจะอยู่ทั้งสองที่ และรอบถัดไปรวมซ้ำด้วย id
+    """
+    days = ARCHIVE_DAYS if days is None else days
+    if days <= 0:
+        return 0
+    cutoff = (now or datetime.now()) - timedelta(days=days)
+    records = archivable(store, cutoff)
+    if not records:
+        return 0
+
+    by_year = {}
+    for record in records:
+        by_year.setdefault(record.due.year, []).append(record)
+    for year, moved in by_year.items():
+        merged = {r.id: r for r in load_year(year)}
+        merged.update((r.id, r) for r in moved)
+        write_year(year, list(merged.values()))
+
+    store.delete_many([r.id for r in records])
+    # id ที่กู้คืนไว้แต่ถูกลบไปแล้วไม่ต้องจำอีก
+    keep = store.archive_keep
+    if keep:
+        store.set_archive_keep([record_id for record_id in keep if has_record(store, record_id)])
+    Logger.info(f"Archive: moved {len(records)} events older than {cutoff:%Y-%m-%d} to {ARCHIVE_DIR}")
+    return len(records)
+
+
+def has_record(store, record_id) -> bool:
+    try:
+        store.get(record_id)
+    except KeyError:
+        return False
+    return True
+
+
+def restore(store, year: int, record_ids) -> list:
+    """ย้ายกิจกรรมจากไฟล์เก็บถาวรของปีนี้กลับเข้า store (และไม่ย้ายกลับไปเก็บอีก)"""
+    record_ids = set(record_ids)
+    records = load_year(year)
+    restored = [r for r in records if r.id in record_ids]
+    if not restored:
+        return []
+    # เพิ่มกลับเข้า store ก่อน แล้วค่อยเอาออกจากไฟล์ (ปิดกลางคันก็ไม่หาย)
+    store.add_events([r for r in restored if not has_record(store, r.id)])
+    keep = dict.fromkeys(store.archive_keep)
+    keep.update(dict.fromkeys(r.id for r in restored))
+    store.set_archive_keep(list(keep))
+    write_year(year, [r for r in records if r.id not in record_ids])
+    Logger.info(f"Archive: restored {len(restored)} events from {year}")
+    return restored
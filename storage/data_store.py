@@ -0,0 +1,536 @@
+import os
+import json
+import calendar
+import uuid
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+from kivy.logger import Logger
+
+from services import profiling
+from storage.journal import Journal
+from storage.records import Record
+from storage.recurrence import UPCOMING_HORIZON, RecurringEvents, RepeatRule, month_window
+from storage.writer import BackgroundWriter
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_PATH = os.path.join(DATA_DIR, "data.json")
+IMAGE_DIR = os.path.join(DATA_DIR, "images")
+
+# compact journal กลับเข้า data.json เมื่อไฟล์ journal ใหญ่เกินขนาดนี้
+JOURNAL_COMPACT_BYTES = 64 * 1024
+# รวมการบันทึกที่เกิดติด ๆ กันภายในช่วงเวลานี้ (วินาที) ให้เป็นการเขียนครั้งเดียว
+SAVE_DELAY = 0.5
+
+
+RECORD_KINDS = ("tasks", "events")
+
+
+def empty_data():
+    return {"tasks": [], "class_image": "", "events": [], "archive_keep": []}
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex
+
+
+def parse_due(date_text: str, time_text: str = ""):
+    """แปลง "YYYY-MM-DD" (+ "HH:MM") เป็น datetime, ValueError ถ้ารูปแบบผิด"""
+    if time_text:
+        return datetime.strptime(f"{date_text} {time_text}", "%Y-%m-%d %H:%M")
+    return datetime.strptime(date_text, "%Y-%m-%d")
+
+
+class StoreListeners:
+    """ระบบแจ้งเตือนการเปลี่ยนแปลงที่ใช้ร่วมกันทุก backend"""
+
+    def __init__(self):
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """callback(op, record) ถูกเรียกหลังทุกการเปลี่ยนแปลง record
+
+        op เป็น "add", "update" หรือ "delete" ให้หน้าจอปรับเฉพาะส่วนที่เปลี่ยน
+        ส่วน "add_many" (add_events) ส่ง list ของ record ทั้ง batch มาในครั้งเดียว
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def _notify(self, op: str, record):
+        for callback in list(self._listeners):
+            callback(op, record)
+
+
+class DataStore(RecurringEvents, StoreListeners):
+    """เก็บข้อมูลทั้งหมดของแอปไว้ในหน่วยความจำ
+
+    โหลด data.json ครั้งเดียว แล้วเขียนกลับเฉพาะเมื่อมีการเปลี่ยนแปลง
+    ในโหมด journal การแก้ไขแต่ละครั้งจะต่อท้ายไฟล์ journal หนึ่งบรรทัด
+    และ data.json จะถูกสร้างใหม่เบื้องหลังเมื่อ journal ใหญ่พอ
+    การเขียน data.json ทั้งหมดทำบน worker thread ผ่าน BackgroundWriter
+
+    ในหน่วยความจำ tasks และ events เก็บเป็น dict {id: Record} เพื่อให้
+    ค้นหา / สลับสถานะ / ลบ ด้วย id ได้ในเวลาคงที่ และมีดัชนี
+    วันที่ -> record สำหรับให้ปฏิทินดึงข้อมูลทั้งเดือนได้ในครั้งเดียว
+    วันเวลาของแต่ละ record ถูกแปลงเป็น datetime (Record.due) ครั้งเดียวตอนโหลด / เพิ่ม / แก้ไข
+    event ที่เกิดซ้ำไม่อยู่ในดัชนีวันที่ / timeline แต่ขยายเป็น occurrence ตามช่วงที่ถูกขอ
+    """
+
+    def __init__(self, path=DATA_PATH, journal=True):
+        super().__init__()
+        self.path = path
+        self.journal = Journal(os.path.splitext(path)[0] + ".journal") if journal else None
+        self.writer = BackgroundWriter(self._write_pending, delay=SAVE_DELAY)
+        self._lock = threading.RLock()
+        self._data = None
+        self._kinds = {}  # id -> "tasks" / "events"
+        self._by_date = {}  # "YYYY-MM-DD" -> {id: record}
+        # timeline_key ของทุก record เรียงจากเก่าไปใหม่ ใช้ตัดเป็นหน้า ๆ โดยไม่ต้องเรียงใหม่ทุกครั้ง
+        self._timeline = []
+        self._recurring = {}  # id -> record ที่มี repeat
+        self.malformed = {}  # id -> ข้อความวันที่ที่แปลงไม่ได้
+        self._seq = 0
+        # seq สุดท้ายใน journal ที่ rotate ไว้ ลบไฟล์ได้เมื่อ snapshot ครอบคลุมถึง seq นี้
+        self._rotated_upto = 0
+
+    # ------------------ Load / Save ------------------
+    def load(self):
+        """โหลดไฟล์ครั้งแรกเท่านั้น ครั้งต่อไปคืนข้อมูลที่อยู่ในหน่วยความจำ"""
+        if self._data is None:
+            data = self._read()
+            self._seq = data.pop("journal_seq", 0)
+            self._data = data
+            migrated = self._index_records()
+            if self.journal is not None:
+                for entry in self.journal.replay():
+                    if entry.get("seq", 0) > self._seq:
+                        self._apply(entry)
+                        self._seq = entry["seq"]
+                self.journal.trim_torn()
+                if os.path.exists(self.journal.rotated_path):
+                    # compact รอบก่อนไม่เสร็จ (แอปปิดกลางคัน) ทำต่อให้จบ
+                    self._rotated_upto = self._seq
+                    self.writer.request()
+            if migrated:
+                # id ใหม่ต้องลงดิสก์ก่อนที่ journal จะอ้างถึง
+                self.save()
+                self.flush()
+        return self._data
+
+    def _index_records(self) -> bool:
+        """แปลง list ของ dict เป็น {id: Record} เติม id ให้ record เก่าที่ยังไม่มี และสร้างดัชนีใหม่"""
+        migrated = False
+        self._kinds = {}
+        self._by_date = {}
+        self._recurring = {}
+        self.invalidate_occurrences()
+        for kind in RECORD_KINDS:
+            records = self._data[kind]
+            if isinstance(records, dict):
+                records = list(records.values())
+            by_id = {}
+            for record in records:
+                if isinstance(record, dict):
+                    record = Record.from_dict(kind, record)
+                if not record.id:
+                    record.id = new_id()
+                    migrated = True
+                by_id[record.id] = record
+                self._index_one(record)
+            self._data[kind] = by_id
+        self._timeline = sorted(
+            self.timeline_key(r)
+            for kind in RECORD_KINDS
+            for r in self._data[kind].values()
+            if r.repeat is None
+        )
+        return migrated
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return empty_data()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                profiling.add("json_read", f.tell())
+        except json.JSONDecodeError:
+            return empty_data()
+
+        data.setdefault("tasks", [])
+        data.setdefault("class_image", "")
+        data.setdefault("archive_keep", [])
+        data.setdefault("events", [])
+        return data
+
+    def save(self):
+        """ขอให้บันทึก data.json (เขียนจริงบน worker thread หลังจาก SAVE_DELAY)"""
+        self.writer.request()
+
+    def flush(self):
+        """เขียนทุกอย่างที่ค้างอยู่ลงดิสก์ทันที"""
+        self.writer.flush()
+
+    def close(self):
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+
+    def _snapshot(self):
+        data = self.load()
+        return {
+            "tasks": [t.to_dict() for t in data["tasks"].values()],
+            "class_image": data.get("class_image", ""),
+            "archive_keep": data.get("archive_keep", []),
+            "events": [e.to_dict() for e in data["events"].values()],
+            "journal_seq": self._seq,
+        }
+
+    def _write_pending(self):
+        # คัดลอกข้อมูลภายใต้ lock (เร็ว) แล้วค่อย serialize และเขียนนอก lock
+        with self._lock:
+            snapshot = self._snapshot()
+        self._write_snapshot(snapshot)
+
+        with self._lock:
+            if self._rotated_upto and snapshot["journal_seq"] >= self._rotated_upto:
+                self.journal.drop_rotated()
+                self._rotated_upto = 0
+
+    def _write_snapshot(self, snapshot):
+        """เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อย rename เพื่อไม่ให้ data.json ขาดครึ่ง"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=4)
+            profiling.add("json_written", f.tell())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    # ------------------ Journal ------------------
+    def _commit(self, entry: dict):
+        """นำการเปลี่ยนแปลงไปใช้กับข้อมูลในหน่วยความจำ แล้วบันทึกลงดิสก์"""
+        self.load()
+        with self._lock:
+            self._apply(entry)
+            if self.journal is None:
+                self.save()
+                return
+
+            self._seq += 1
+            entry["seq"] = self._seq
+            self.journal.append(entry)
+            if self.journal.size >= JOURNAL_COMPACT_BYTES:
+                self.compact()
+
+    def _apply(self, entry: dict):
+        data = self._data
+        op = entry["op"]
+        if op == "add":
+            self._add_record(entry["kind"], entry["record"])
+            return
+        if op == "add_many":
+            for record in entry["records"]:
+                self._add_record(entry["kind"], record)
+            return
+
+        if op == "set":
+            data[entry["key"]] = entry["value"]
+            return
+
+        if op == "delete_many":
+            self._delete_many(entry["ids"])
+            return
+
+        record_id = entry["id"]
+        kind = self._kinds.get(record_id)
+        if kind is None:
+            return
+        if op == "toggle":
+            record = data[kind][record_id]
+            record.done = not record.done
+            if record.repeat is not None:
+                self.invalidate_occurrences()
+        elif op == "edit":
+            record = data[kind][record_id]
+            self._unindex_one(record)
+            record.update(entry["fields"])
+            self._index_one(record)
+            self._add_to_timeline(record)
+        elif op == "delete":
+            self._unindex_one(data[kind].pop(record_id))
+
+    def _delete_many(self, record_ids: list):
+        """ลบหลาย record แล้วสร้าง timeline ใหม่ครั้งเดียว (ลบทีละตัวจาก list ใหญ่ช้ากว่ามาก)"""
+        removed = set()
+        for record_id in record_ids:
+            kind = self._kinds.get(record_id)
+            if kind is not None:
+                self._unindex_one(self._data[kind].pop(record_id), timeline=False)
+                removed.add(record_id)
+        if removed:
+            self._timeline = [key for key in self._timeline if key[1] not in removed]
+
+    def _add_record(self, kind: str, fields: dict):
+        record = Record.from_dict(kind, fields)
+        self._data[kind][record.id] = record
+        self._index_one(record)
+        self._add_to_timeline(record)
+
+    def _index_one(self, record: Record):
+        record_id = record.id
+        self._kinds[record_id] = record.kind
+        date_key = record.date
+        if record.repeat is not None:
+            self._recurring[record_id] = record
+            self.invalidate_occurrences()
+        elif date_key:
+            self._by_date.setdefault(date_key, {})[record_id] = record
+
+        # แปลงวันที่ครั้งเดียว รายการที่ผิดรูปแบบแจ้งเตือนครั้งเดียวแล้วจำไว้
+        record.due = None
+        if date_key:
+            try:
+                record.due = parse_due(date_key, record.time)
+            except ValueError:
+                if record_id not in self.malformed:
+                    Logger.warning(
+                        f"Storage: record {record_id} has a malformed date "
+                        f"{date_key!r} {record.time!r}"
+                    )
+                self.malformed[record_id] = f"{date_key} {record.time}".strip()
+            else:
+                self.malformed.pop(record_id, None)
+
+    def _add_to_timeline(self, record: Record):
+        if record.repeat is None:
+            insort(self._timeline, self.timeline_key(record))
+
+    def _unindex_one(self, record: Record, timeline=True):
+        record_id = record.id
+        if timeline:
+            key = self.timeline_key(record)
+            index = bisect_left(self._timeline, key)
+            if index < len(self._timeline) and self._timeline[index] == key:
+                del self._timeline[index]
+        self._kinds.pop(record_id, None)
+        self.malformed.pop(record_id, None)
+        if self._recurring.pop(record_id, None) is not None:
+            self.invalidate_occurrences()
+        bucket = self._by_date.get(record.date)
+        if bucket is not None:
+            bucket.pop(record_id, None)
+            if not bucket:
+                del self._by_date[record.date]
+
+    def compact(self):
+        """ย้าย journal ออกไปแล้วให้ worker สร้าง data.json ใหม่จากข้อมูลในหน่วยความจำ"""
+        if self.journal is None:
+            return
+        with self._lock:
+            self.journal.rotate()
+            self._rotated_upto = self._seq
+        self.save()
+
+    # ------------------ Accessors ------------------
+    @property
+    def tasks(self):
+        return self.load()["tasks"].values()
+
+    @property
+    def events(self):
+        return self.load()["events"].values()
+
+    def get(self, record_id: str) -> Record:
+        self.load()
+        kind = self._kinds[record_id]
+        return self._data[kind][record_id]
+
+    def due(self, record_id: str):
+        """datetime ที่แปลงไว้แล้วของ record (None ถ้าไม่มีวันที่หรือรูปแบบผิด)"""
+        return self.get(record_id).due
+
+    def recurring(self):
+        """record ที่เกิดซ้ำ (ใช้ขยายเป็น occurrence)"""
+        self.load()
+        return self._recurring.values()
+
+    def on_date(self, date_key: str):
+        """record ทั้งหมดของวันที่ "YYYY-MM-DD" รวม occurrence ของกิจกรรมที่เกิดซ้ำ"""
+        self.load()
+        records = list(self._by_date.get(date_key, {}).values())
+        try:
+            start = datetime.strptime(date_key, "%Y-%m-%d")
+        except ValueError:
+            return records
+        return records + self.occurrences(start, start + timedelta(days=1))
+
+    def month_summary(self, year: int, month: int) -> dict:
+        """{วันที่: (จำนวนทั้งหมด, จำนวนที่ยังไม่เสร็จ)} เฉพาะวันที่มี record"""
+        self.load()
+        summary = {}
+        for day in range(1, calendar.monthrange(year, month)[1] + 1):
+            bucket = self._by_date.get(f"{year}-{month:02d}-{day:02d}")
+            if bucket:
+                pending = sum(1 for r in bucket.values() if not r.done)
+                summary[day] = (len(bucket), pending)
+        return self.add_occurrence_counts(summary, year, month)
+
+    # ------------------ Queries ------------------
+    def events_in_month(self, year: int, month: int) -> list:
+        """record ทั้งหมดในเดือนนี้ เรียงตามวันเวลา"""
+        self.load()
+        records = []
+        for day in range(1, calendar.monthrange(year, month)[1] + 1):
+            records.extend(self._by_date.get(f"{year}-{month:02d}-{day:02d}", {}).values())
+        records.extend(self.occurrences(*month_window(year, month)))
+        records.sort(key=lambda r: (r.date, r.time))
+        return records
+
+    def pending_upcoming(self, now=None, limit=None) -> list:
+        """กิจกรรมที่ยังไม่เสร็จและยังไม่ถึงกำหนด เรียงจากใกล้ที่สุด"""
+        self.load()
+        now = now or datetime.now()
+        upcoming = [
+            r
+            for kind in RECORD_KINDS
+            for r in self._data[kind].values()
+            if r.due is not None and r.due >= now and not r.done and r.repeat is None
+        ]
+        upcoming.extend(o for o in self.occurrences(now, now + UPCOMING_HORIZON) if not o.done)
+        upcoming.sort(key=lambda r: r.due)
+        return upcoming[:limit]
+
+    @staticmethod
+    def timeline_key(record: Record):
+        """ลำดับของ record ในรายการกิจกรรม (ไม่มีวันที่ถือว่าเก่าที่สุด) ใช้เป็น cursor ของ timeline_page"""
+        return (record.due or datetime.min, record.id)
+
+    @staticmethod
+    def moment_key(moment: datetime):
+        """cursor ที่อยู่ระหว่าง record ที่ครบกำหนดก่อน moment กับตั้งแต่ moment เป็นต้นไป"""
+        return (moment, "")
+
+    def timeline_page(self, after=None, limit=50, before=None) -> list:
+        """record ไม่เกิน limit รายการ เรียงจากใหม่ไปเก่า ต่อจาก cursor after (None = เริ่มจากใหม่สุด)
+
+        ถ้าให้ before จะได้ record ที่ใหม่กว่า cursor นั้นที่ใกล้ที่สุดแทน (หน้าที่อยู่เหนือส่วนที่โหลดไว้)
+        ไม่รวมกิจกรรมที่เกิดซ้ำ หน้าจอขยาย occurrence ของช่วงเวลาของหน้านั้นเอง
+        """
+        self.load()
+        if before is not None:
+            start = bisect_right(self._timeline, before)
+            page = self._timeline[start : start + limit]
+        else:
+            end = len(self._timeline) if after is None else bisect_left(self._timeline, after)
+            page = self._timeline[max(0, end - limit) : end]
+        return [self.get(record_id) for _, record_id in reversed(page)]
+
+    def events_before(self, cutoff: datetime) -> list:
+        """event ที่ครบกำหนดก่อน cutoff เรียงจากเก่าไปใหม่ (ไม่รวมที่ไม่มีวันที่และกิจกรรมที่เกิดซ้ำ)"""
+        self.load()
+        end = bisect_left(self._timeline, (cutoff, ""))
+        records = (self.get(record_id) for _, record_id in self._timeline[:end])
+        return [r for r in records if r.due is not None and not r.is_task]
+
+    def search_title(self, text: str) -> list:
+        text = text.casefold()
+        return [r for r in list(self.tasks) + list(self.events) if text in r.title.casefold()]
+
+    @property
+    def class_image(self) -> str:
+        return self.load().get("class_image", "")
+
+    def set_class_image(self, path: str):
+        if path == self.class_image:
+            return
+        self._commit({"op": "set", "key": "class_image", "value": path})
+
+    @property
+    def archive_keep(self) -> list:
+        """id ของกิจกรรมที่ถูกกู้คืนจากไฟล์เก็บถาวร (ไม่ย้ายกลับไปเก็บอีก)"""
+        return self.load().get("archive_keep", [])
+
+    def set_archive_keep(self, record_ids: list):
+        if record_ids == self.archive_keep:
+            return
+        self._commit({"op": "set", "key": "archive_keep", "value": list(record_ids)})
+
+    # ------------------ Mutations ------------------
+    def add_event(self, title: str, date: str, time: str = "", details: str = "", repeat=None) -> Record:
+        """เพิ่มกิจกรรม repeat เป็น dict ของ RepeatRule ถ้าเกิดซ้ำ (date คือครั้งแรก)"""
+        rule = RepeatRule.from_dict(repeat) if repeat else None
+        record = Record(new_id(), "events", title, date, time, details, repeat=rule)
+        self._commit({"op": "add", "kind": "events", "record": record.to_dict()})
+        record = self.get(record.id)
+        self._notify("add", record)
+        return record
+
+    def add_events(self, records: list) -> list:
+        """เพิ่มหลาย record ใน journal entry เดียว (เขียนดิสก์ครั้งเดียว ใช้ตอนนำเข้าทีละ batch)"""
+        if not records:
+            return []
+        self._commit(
+            {"op": "add_many", "kind": "events", "records": [record.to_dict() for record in records]}
+        )
+        added = [self.get(record.id) for record in records]
+        self._notify("add_many", added)
+        return added
+
+    def toggle_done(self, record_id: str):
+        record = self.get(record_id)
+        self._commit({"op": "toggle", "id": record_id})
+        self._notify("update", record)
+
+    def edit(self, record_id: str, **fields):
+        """แก้ไขข้อมูลของ record (เช่น title, date, time, details)"""
+        record = self.get(record_id)
+        self._commit({"op": "edit", "id": record_id, "fields": fields})
+        self._notify("update", record)
+
+    def delete(self, record_id: str):
+        record = self.get(record_id)
+        self._commit({"op": "delete", "id": record_id})
+        self._notify("delete", record)
+
+    def delete_many(self, record_ids: list):
+        """ลบหลาย record ใน journal entry เดียว (ใช้ตอนย้ายไปเก็บถาวร)"""
+        if not record_ids:
+            return
+        records = [self.get(record_id) for record_id in record_ids]
+        self._commit({"op": "delete_many", "ids": list(record_ids)})
+        for record in records:
+            self._notify("delete", record)
+
+
+# "json" (ค่าเริ่มต้น) หรือ "sqlite"
+STORAGE_BACKEND = os.environ.get("STUDENT_LIFE_STORAGE", "json")
+DB_PATH = os.path.join(DATA_DIR, "data.db")
+
+_store = None
+
+
+def get_store():
+    """คืน store ตัวเดียวที่ทุกหน้าจอใช้ร่วมกัน (DataStore หรือ SQLiteStore)"""
+    global _store
+    if _store is None:
+        if STORAGE_BACKEND == "sqlite":
+            from storage.sqlite_store import SQLiteStore, migrate_json
+
+            # ครั้งแรกที่เปลี่ยนมาใช้ SQLite ย้ายข้อมูลจาก data.json มาให้
+            if not os.path.exists(DB_PATH) and os.path.exists(DATA_PATH):
+                migrate_json(DATA_PATH, DB_PATH)
+            _store = SQLiteStore(DB_PATH)
+        else:
+            _store = DataStore()
+    return _store
+
+
+def use_store(store):
+    """เปลี่ยน store ที่ get_store() คืน (เช่น benchmark ที่ใช้ไฟล์ข้อมูลจำลอง)"""
+    global _store
+    _store = store
@@ -0,0 +1,165 @@
+import os
+import re
+import shutil
+import hashlib
+from collections import Counter
+
+from kivy.logger import Logger
+
+from storage.data_store import DATA_DIR, IMAGE_DIR, get_store
+
+# (path, size, mtime) -> sha1 ของเนื้อไฟล์ จะได้ไม่ต้อง hash ไฟล์เดิมซ้ำ
+_digests = {}
+# ชื่อไฟล์ที่ import_image สร้าง (sha1 + นามสกุล) รูปชื่ออื่นของแอปรุ่นก่อนไม่ถูกเก็บกวาด
+BLOB_NAME = re.compile(r"[0-9a-f]{40}(\.\w+)?")
+
+
+def file_digest(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    digest = _digests.get(key)
+    if digest is None:
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha1.update(chunk)
+        digest = _digests[key] = sha1.hexdigest()
+    return digest
+
+
+def image_path_for(digest, ext):
+    return os.path.join(IMAGE_DIR, f"{digest}{ext.lower()}")
+
+
+def import_image(source):
+    """คัดลอกรูปเข้า IMAGE_DIR โดยตั้งชื่อตาม hash ของเนื้อไฟล์
+
+    ถ้ามีไฟล์เนื้อหาเดียวกันอยู่แล้วจะไม่คัดลอกซ้ำ คืน path ของรูปใน IMAGE_DIR
+    """
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    path = image_path_for(file_digest(source), os.path.splitext(source)[1])
+    if not os.path.exists(path):
+        shutil.copyfile(source, path + ".tmp")
+        os.replace(path + ".tmp", path)
+    return path
+
+
+# ref ที่เก็บในข้อมูล -> path จริง ("" ถ้าไฟล์หาย) ตรวจครั้งเดียวตอนเริ่มแอป
+_resolved = {}
+
+
+def to_ref(path):
+    """path สำหรับเก็บในข้อมูล: relative กับ DATA_DIR ถ้าไฟล์อยู่ใน DATA_DIR"""
+    if not path:
+        return ""
+    abspath = os.path.abspath(path)
+    data_dir = os.path.abspath(DATA_DIR)
+    if os.path.commonpath([abspath, data_dir]) == data_dir:
+        return os.path.relpath(abspath, data_dir).replace(os.sep, "/")
+    return path
+
+
+def portable_ref(ref):
+    """แปลง path แบบ absolute ของเครื่องอื่น (เช่น /Users/.../data/images/x.jpg) เป็น relative"""
+    if not ref or not os.path.isabs(ref):
+        return ref
+    if os.path.exists(ref):
+        return to_ref(ref)
+    candidate = os.path.join(IMAGE_DIR, os.path.basename(ref))
+    if os.path.exists(candidate):
+        return to_ref(candidate)
+    return ref
+
+
+def resolve_image(ref):
+    """path จริงของ ref (ไม่ตรวจว่าไฟล์มีอยู่)"""
+    if not ref:
+        return ""
+    if os.path.isabs(ref):
+        return os.path.abspath(ref)
+    return os.path.abspath(os.path.join(DATA_DIR, ref))
+
+
+def references(store=None):
+    """ref ของรูปทั้งหมดที่ข้อมูลของแอปอ้างถึง"""
+    store = store or get_store()
+    for ref in (store.class_image,):
+        if ref:
+            yield ref
+
+
+def validate_assets(store=None):
+    """รันครั้งเดียวตอนเริ่มแอป: แปลง path เก่าให้เป็น relative และตรวจว่าทุกไฟล์มีอยู่จริง"""
+    store = store or get_store()
+    portable = portable_ref(store.class_image)
+    if portable != store.class_image:
+        Logger.info(f"ImageStore: rewrote class image path to {portable}")
+        store.set_class_image(portable)
+
+    _resolved.clear()
+    for ref in references(store):
+        asset_path(ref)
+
+
+def asset_path(ref):
+    """path จริงของ ref จาก cache ("" ถ้าไม่มีไฟล์) ไม่ต้อง stat ไฟล์ทุกครั้งที่เข้าหน้าจอ"""
+    if not ref:
+        return ""
+    path = _resolved.get(ref)
+    if path is None:
+        path = resolve_image(ref)
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            Logger.warning(f"ImageStore: referenced image {ref} is missing")
+            path = ""
+        _resolved[ref] = path
+    return path
+
+
+def remember(ref, path):
+    """บันทึกผลลง cache เมื่อรู้อยู่แล้วว่าไฟล์มีอยู่ (เช่น เพิ่ง import มา)"""
+    _resolved[ref] = path
+
+
+def reference_counts(store=None):
+    """จำนวนการอ้างถึงรูปแต่ละไฟล์จากข้อมูลของแอป"""
+    counts = Counter()
+    for ref in references(store):
+        counts[resolve_image(ref)] += 1
+    return counts
+
+
+def release(ref, store=None):
+    """ลบรูปเมื่อไม่มีข้อมูลไหนอ้างถึงแล้ว (เฉพาะไฟล์ใน IMAGE_DIR)"""
+    path = resolve_image(ref)
+    if not path or os.path.dirname(path) != os.path.abspath(IMAGE_DIR):
+        return
+    if reference_counts(store)[path] == 0 and os.path.exists(path):
+        _resolved.pop(ref, None)
+        try:
+            os.remove(path)
+        except OSError as e:
+            Logger.warning(f"ImageStore: cannot remove {path}: {e}")
+
+
+def collect_garbage(store=None):
+    """ลบไฟล์ที่ import_image สร้างซึ่งไม่มีใครอ้างถึง หรือขนาด 0 byte คืนรายการที่ลบ
+
+    ไฟล์ชื่ออื่นใน IMAGE_DIR (รูปของผู้ใช้จากแอปรุ่นก่อน) ไม่ถูกแตะ
+    """
+    if not os.path.isdir(IMAGE_DIR):
+        return []
+    counts = reference_counts(store)
+    removed = []
+    with os.scandir(IMAGE_DIR) as it:
+        for entry in it:
+            if not entry.is_file() or not BLOB_NAME.fullmatch(entry.name):
+                continue
+            path = os.path.abspath(entry.path)
+            if counts[path] == 0 or entry.stat().st_size == 0:
+                try:
+                    os.remove(path)
+                    removed.append(path)
+                    Logger.info(f"ImageStore: removed unreferenced image {entry.name}")
+                except OSError as e:
+                    Logger.warning(f"ImageStore: cannot remove {path}: {e}")
+    return removed
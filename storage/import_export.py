@@ -0,0 +1,388 @@
+import os
+import re
+import csv
+import json
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+from kivy.logger import Logger
+
+from storage.data_store import DATA_DIR, new_id, parse_due
+from storage.records import Record
+from storage.recurrence import RepeatRule
+
+EXPORT_DIR = os.path.join(DATA_DIR, "exports")
+# จำนวนกิจกรรมต่อหนึ่ง batch: นำเข้า = store.add_events หนึ่งครั้ง, ส่งออก = เขียนไฟล์หนึ่งครั้ง
+BATCH_SIZE = 200
+CSV_COLUMNS = ["title", "date", "time", "details", "done", "repeat"]
+TRUE_TEXT = {"1", "true", "yes", "y", "done", "x"}
+
+ICS_WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+ICS_FREQ = {"DAILY": "daily", "WEEKLY": "weekly"}
+# วันที่ที่ทำเสร็จแล้วของกิจกรรมที่เกิดซ้ำ (iCalendar ไม่มี property มาตรฐานสำหรับเรื่องนี้)
+ICS_COMPLETED = "X-STUDENT-LIFE-COMPLETED"
+ICS_LINE_OCTETS = 75
+ICS_ESCAPED = re.compile(r"\\(.)")
+
+# done / skipped = จำนวนกิจกรรมที่นำเข้า (ส่งออก) แล้ว / ที่ข้ามไปเพราะข้อมูลผิด
+# fraction = สัดส่วนของไฟล์ที่อ่านแล้ว (None ถ้าไม่รู้ขนาดทั้งหมด)
+Progress = namedtuple("Progress", "done skipped fraction")
+# ข้อผิดพลาดที่ทำให้นำเข้า / ส่งออกไม่สำเร็จ (ไฟล์เปิดไม่ได้ / ไม่ใช่ UTF-8 / CSV เสีย)
+TRANSFER_ERRORS = (OSError, ValueError, csv.Error)
+
+
+class ReadPosition:
+    """อ่านไฟล์ทีละบรรทัดแบบ stream และจำว่าอ่านไปแล้วกี่ไบต์ (ใช้คำนวณความคืบหน้า)"""
+
+    def __init__(self, f):
+        self._file = f
+        self.size = os.fstat(f.fileno()).st_size
+        self.offset = 0
+
+    def __iter__(self):
+        for raw in self._file:
+            self.offset += len(raw)
+            yield raw.decode("utf-8-sig" if self.offset == len(raw) else "utf-8")
+
+    @property
+    def fraction(self):
+        return self.offset / self.size if self.size else 1.0
+
+
+# ------------------ Import ------------------
+def import_events(store, path, batch_size=BATCH_SIZE):
+    """นำเข้ากิจกรรมจากไฟล์ .csv หรือ .ics (generator)
+
+    อ่านและตรวจวันที่ทีละแถว บันทึกทีละ batch ด้วย store.add_events (เขียนดิสก์ครั้งเดียวต่อ batch)
+    แล้ว yield Progress หลังทุก batch ให้ผู้เรียกแบ่งงานไปทำทีละเฟรมได้
+    """
+    parse = parse_ics if path.lower().endswith(".ics") else parse_csv
+    done = skipped = 0
+    batch = []
+    with open(path, "rb") as f:
+        lines = ReadPosition(f)
+        for line_no, record in parse(lines):
+            if isinstance(record, str):
+                Logger.warning(f"Import: {os.path.basename(path)} line {line_no}: {record}")
+                skipped += 1
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                store.add_events(batch)
+                done += len(batch)
+                batch = []
+                yield Progress(done, skipped, lines.fraction)
+        if batch:
+            store.add_events(batch)
+            done += len(batch)
+    Logger.info(f"Import: {done} events from {path} ({skipped} skipped)")
+    yield Progress(done, skipped, 1.0)
+
+
+def make_record(title, date_text, time_text="", details="", done=False, repeat=None):
+    """Record ใหม่จากข้อมูลหนึ่งแถว หรือข้อความบอกเหตุผลถ้าข้อมูลใช้ไม่ได้
+
+    วันที่ว่างได้ (กิจกรรมที่ไม่มีวันที่ซึ่ง export CSV เขียนออกมา) แต่ถ้ามีต้องถูกรูปแบบ
+    """
+    if not title:
+        return "missing title"
+    due = None
+    if date_text:
+        try:
+            due = parse_due(date_text, time_text)
+        except ValueError:
+            return f"malformed date {date_text!r} {time_text!r}"
+    return Record(new_id(), "events", title, date_text, time_text, details, done, due, repeat)
+
+
+def parse_csv(lines):
+    """yield (เลขบรรทัด, Record หรือข้อความผิดพลาด) ต้องมีหัวตาราง title,date (ที่เหลือไม่บังคับ)"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        title = (row.get("title") or "").strip()
+        date_text = (row.get("date") or "").strip()
+        if not title and not date_text:
+            continue
+        repeat = None
+        repeat_text = (row.get("repeat") or "").strip()
+        if repeat_text:
+            try:
+                repeat = RepeatRule.from_dict(json.loads(repeat_text))
+            except (ValueError, KeyError, TypeError):
+                yield reader.line_num, f"malformed repeat {repeat_text!r}"
+                continue
+        yield reader.line_num, make_record(
+            title,
+            date_text,
+            (row.get("time") or "").strip(),
+            (row.get("details") or "").strip(),
+            (row.get("done") or "").strip().casefold() in TRUE_TEXT,
+            repeat,
+        )
+
+
+def unfold_ics(lines):
+    """รวมบรรทัดที่ถูกพับ (ขึ้นต้นด้วยช่องว่าง) กลับเป็นบรรทัดเดียว yield (เลขบรรทัด, ข้อความ)"""
+    current, start = None, 0
+    for line_no, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, line_no
+    if current:
+        yield start, current
+
+
+def parse_ics(lines):
+    """yield (เลขบรรทัด, Record หรือข้อความผิดพลาด) ของทุก VEVENT"""
+    event = None
+    start = 0
+    for line_no, line in unfold_ics(lines):
+        name, _, value = line.partition(":")
+        name, *params = name.split(";")
+        name = name.upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event, start = {"EXDATE": []}, line_no
+        elif event is None:
+            continue
+        elif name == "END" and value.upper() == "VEVENT":
+            yield start, record_from_ics(event)
+            event = None
+        elif name == "EXDATE":
+            event["EXDATE"].extend(value.split(","))
+        else:
+            event[name] = (value, params)
+
+
+def ics_datetime(value: str):
+    """(วันที่ "YYYY-MM-DD", เวลา "HH:MM" หรือ "") จากค่าแบบ 20260105 / 20260105T090000(Z)"""
+    value = value.strip()
+    day = datetime.strptime(value[:8], "%Y%m%d")
+    if len(value) < 15:
+        return day.strftime("%Y-%m-%d"), ""
+    at = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        # เวลา UTC แปลงเป็นเวลาของเครื่อง
+        at = at.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return at.strftime("%Y-%m-%d"), at.strftime("%H:%M")
+
+
+def ics_text(value: str) -> str:
+    """ถอด escape ของข้อความ iCalendar (\\n, \\, \\; \\\\)"""
+    return ICS_ESCAPED.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def record_from_ics(event: dict):
+    if "DTSTART" not in event:
+        return "missing DTSTART"
+    try:
+        date_text, time_text = ics_datetime(event["DTSTART"][0])
+    except ValueError:
+        return f"malformed DTSTART {event['DTSTART'][0]!r}"
+
+    repeat = None
+    if "RRULE" in event:
+        try:
+            repeat = repeat_from_rrule(event["RRULE"][0], date_text, event)
+        except ValueError as e:
+            return str(e)
+
+    return make_record(
+        ics_text(event.get("SUMMARY", ("", []))[0]).strip(),
+        date_text,
+        time_text,
+        ics_text(event.get("DESCRIPTION", ("", []))[0]).strip(),
+        event.get("STATUS", ("", []))[0].upper() == "COMPLETED",
+        repeat,
+    )
+
+
+def repeat_from_rrule(rrule: str, date_text: str, event: dict) -> RepeatRule:
+    parts = dict(part.partition("=")[::2] for part in rrule.upper().split(";") if part)
+    freq = ICS_FREQ.get(parts.get("FREQ"))
+    if freq is None:
+        raise ValueError(f"unsupported RRULE {rrule!r}")
+    try:
+        weekdays = [ICS_WEEKDAYS.index(day[-2:]) for day in parts["BYDAY"].split(",")] if "BYDAY" in parts else []
+        rule = RepeatRule(
+            freq,
+            int(parts.get("INTERVAL", 1)),
+            weekdays,
+            ics_datetime(parts["UNTIL"])[0] if "UNTIL" in parts else "",
+            [ics_datetime(value)[0] for value in event["EXDATE"]],
+            [ics_datetime(value)[0] for value in event.get(ICS_COMPLETED, ("", []))[0].split(",") if value],
+        )
+    except ValueError:
+        raise ValueError(f"malformed RRULE {rrule!r}") from None
+
+    if "COUNT" in parts and rule.until is None:
+        # แปลงจำนวนครั้งเป็นวันสิ้นสุด
+        count = int(parts["COUNT"])
+        first = date.fromisoformat(date_text)
+        span = timedelta(days=count * rule.interval * (7 if freq == "weekly" else 1) + 7)
+        days = RepeatRule(freq, rule.interval, rule.weekdays).days(first, first, first + span)
+        if days:
+            rule.until = days[min(count, len(days)) - 1]
+    return rule
+
+
+# ------------------ Export ------------------
+def export_path(extension: str) -> str:
+    """ไฟล์ปลายทางใน data/exports เช่น events-20260105.csv"""
+    return os.path.join(EXPORT_DIR, f"events-{date.today():%Y%m%d}.{extension}")
+
+
+def stream_events(store, page_size=BATCH_SIZE):
+    """ทุกกิจกรรมทีละหน้า (keyset) ไม่โหลดทั้งหมดเข้าหน่วยความจำ และไม่พังถ้ามีการแก้ไขระหว่างทาง"""
+    for record in store.recurring():
+        yield record
+    cursor = None
+    while True:
+        page = store.timeline_page(after=cursor, limit=page_size)
+        for record in page:
+            if not record.is_task:
+                yield record
+        if len(page) < page_size:
+            return
+        cursor = store.timeline_key(page[-1])
+
+
+def export_events(store, path, batch_size=BATCH_SIZE):
+    """ส่งออกกิจกรรมทั้งหมดเป็น .csv หรือ .ics (generator)
+
+    เขียนลงไฟล์ชั่วคราวทีละ batch แล้ว yield Progress หลังทุก batch
+    เสร็จแล้วจึง rename ทับไฟล์ปลายทาง (ถ้าหยุดกลางคันไฟล์เดิมไม่เสียหาย)
+    """
+    writer = IcsWriter() if path.lower().endswith(".ics") else CsvWriter()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    done = skipped = 0
+    try:
+        with open(tmp_path, "w", encoding=writer.encoding, newline="") as f:
+            batch = [writer.header()]
+            for record in stream_events(store):
+                text = writer.row(record)
+                if text is None:
+                    skipped += 1
+                    continue
+                batch.append(text)
+                done += 1
+                if len(batch) >= batch_size:
+                    f.write("".join(batch))
+                    batch = []
+                    yield Progress(done, skipped, None)
+            batch.append(writer.footer())
+            f.write("".join(batch))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    Logger.info(f"Export: {done} events to {path} ({skipped} skipped)")
+    yield Progress(done, skipped, 1.0)
+
+
+class CsvWriter:
+    """แปลง record เป็นแถว CSV ทีละแถว (csv.writer เขียนลงตัวมันเองแล้วคืนข้อความ)"""
+
+    # ใส่ BOM ไว้หน้าไฟล์ให้ Excel เปิดภาษาไทยได้ถูกต้อง
+    encoding = "utf-8-sig"
+
+    def __init__(self):
+        self._text = ""
+        self._writer = csv.writer(self)
+
+    def write(self, text):
+        self._text = text
+
+    def _line(self, values) -> str:
+        self._writer.writerow(values)
+        return self._text
+
+    def header(self) -> str:
+        return self._line(CSV_COLUMNS)
+
+    def row(self, record) -> str:
+        repeat = json.dumps(record.repeat.to_dict()) if record.repeat is not None else ""
+        return self._line([record.title, record.date, record.time, record.details, int(record.done), repeat])
+
+    def footer(self) -> str:
+        return ""
+
+
+def ics_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def fold_ics(line: str) -> str:
+    """พับบรรทัดที่ยาวเกิน 75 ไบต์ตามมาตรฐาน iCalendar (ไม่ตัดกลางตัวอักษร UTF-8)"""
+    if len(line.encode("utf-8")) <= ICS_LINE_OCTETS:
+        return line + "\r\n"
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > ICS_LINE_OCTETS:
+            parts.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def ics_value(record, day: str) -> str:
+    """ค่าวันที่ (และเวลา) ในรูปแบบ iCalendar ให้ชนิดเดียวกับ DTSTART ของ record"""
+    value = day.replace("-", "")
+    if record.time:
+        value += "T" + record.time.replace(":", "") + "00"
+    return value
+
+
+class IcsWriter:
+    """แปลง record เป็น VEVENT ทีละรายการ record ที่ไม่มีวันที่ใช้ไม่ได้ (iCalendar ต้องมี DTSTART)"""
+
+    # ไฟล์ต้องขึ้นต้นด้วย BEGIN:VCALENDAR ตรง ๆ (ไม่มี BOM) ไม่งั้นโปรแกรมปฏิทินบางตัวไม่ยอมอ่าน
+    encoding = "utf-8"
+
+    def __init__(self):
+        self._stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    def header(self) -> str:
+        return "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Student Life//Events//EN\r\n"
+
+    def row(self, record):
+        if record.due is None:
+            return None
+        date_param = "" if record.time else ";VALUE=DATE"
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{record.id}@student-life",
+            f"DTSTAMP:{self._stamp}",
+            f"DTSTART{date_param}:{ics_value(record, record.date)}",
+            f"SUMMARY:{ics_escape(record.title)}",
+        ]
+        if record.details:
+            lines.append(f"DESCRIPTION:{ics_escape(record.details)}")
+        if record.done:
+            lines.append("STATUS:COMPLETED")
+        rule = record.repeat
+        if rule is not None:
+            rrule = f"RRULE:FREQ={rule.freq.upper()};INTERVAL={rule.interval}"
+            if rule.weekdays:
+                rrule += ";BYDAY=" + ",".join(ICS_WEEKDAYS[day] for day in rule.weekdays)
+            if rule.until:
+                # UNTIL ต้องเป็นชนิดเดียวกับ DTSTART
+                rrule += f";UNTIL={rule.until:%Y%m%d}" + ("T235959" if record.time else "")
+            lines.append(rrule)
+            if rule.exceptions:
+                values = ",".join(ics_value(record, day) for day in sorted(rule.exceptions))
+                lines.append(f"EXDATE{date_param}:{values}")
+            if rule.completed:
+                lines.append(f"{ICS_COMPLETED}:" + ",".join(d.replace("-", "") for d in sorted(rule.completed)))
+        lines.append("END:VEVENT")
+        return "".join(fold_ics(line) for line in lines)
+
+    def footer(self) -> str:
+        return "END:VCALENDAR\r\n"
@@ -0,0 +1,118 @@
+import os
+import json
+
+from kivy.logger import Logger
+
+from services import profiling
+
+
+class Journal:
+    """ไฟล์บันทึกการเปลี่ยนแปลงแบบต่อท้าย (append-only) หนึ่งบรรทัดต่อหนึ่งการกระทำ
+
+    ทุก entry มีเลข seq เรียงกัน เพื่อให้ตอนโหลดข้าม entry ที่ snapshot
+    รวมไว้แล้วได้ แม้ว่าแอปจะปิดไประหว่างการ compact
+    บรรทัดที่เขียนไม่จบ (แอปปิดกะทันหัน) ต้องถูกตัดทิ้งก่อนต่อท้ายไฟล์นั้นอีก
+    ไม่งั้น entry ใหม่จะต่อกับเศษบรรทัดนั้นและอ่านไม่ได้ไปด้วย
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rotated_path = path + ".1"
+        self._file = None
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._valid_end = {}  # path -> ขนาดไฟล์ถึงท้ายบรรทัดสุดท้ายที่อ่านได้ (จาก replay)
+
+    def replay(self):
+        """อ่าน entry ทั้งหมด (ไฟล์ที่ rotate ไว้ก่อน แล้วตามด้วยไฟล์ปัจจุบัน)
+
+        หลังอ่านครบให้เรียก trim_torn() ก่อน append ครั้งแรก
+        """
+        self._valid_end = {}
+        for path in (self.rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            profiling.add("json_read", os.path.getsize(path))
+            self._valid_end[path] = 0
+            for entry, end in self._entries(path):
+                self._valid_end[path] = end
+                yield entry
+
+    @staticmethod
+    def _entries(path):
+        """(entry, ตำแหน่งไบต์ท้ายบรรทัด) ของแต่ละบรรทัด หยุดที่บรรทัดแรกที่เขียนไม่จบ"""
+        end = 0
+        with open(path, "rb") as f:
+            for line in f:
+                # บรรทัดสุดท้ายอาจเขียนไม่จบตอนแอปปิดกะทันหัน (ไม่มี \n หรือ JSON ไม่ครบ)
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    return
+                end += len(line)
+                yield entry, end
+
+    def trim_torn(self):
+        """ตัดเศษบรรทัดที่ replay อ่านไม่ได้ออกจากท้ายไฟล์"""
+        for path, end in self._valid_end.items():
+            self._truncate(path, end)
+        self._valid_end = {}
+        self.size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    @classmethod
+    def _truncate(cls, path, end=None):
+        """ตัดไฟล์ให้เหลือถึง end (ถ้าไม่ระบุ อ่านหาท้ายบรรทัดสุดท้ายที่อ่านได้เอง)"""
+        if not os.path.exists(path):
+            return
+        if end is None:
+            end = 0
+            for _, end in cls._entries(path):
+                pass
+        size = os.path.getsize(path)
+        if size <= end:
+            return
+        with open(path, "r+b") as f:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+        Logger.warning(f"Storage: dropped {size - end} bytes of a torn line at the end of {path}")
+
+    def append(self, entry: dict):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        self._file.write(line)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        size = len(line.encode("utf-8"))
+        self.size += size
+        profiling.add("json_written", size)
+
+    def rotate(self):
+        """ย้ายไฟล์ปัจจุบันไปเป็น .1 แล้วเริ่มไฟล์ใหม่ (ใช้ตอน compact)"""
+        self.close()
+        if os.path.exists(self.path):
+            if os.path.exists(self.rotated_path):
+                # compact รอบก่อนยังไม่เสร็จ: ต่อท้ายไฟล์เดิมไว้ก่อน
+                self._truncate(self.rotated_path)
+                with open(self.rotated_path, "a", encoding="utf-8") as dst, open(
+                    self.path, "r", encoding="utf-8"
+                ) as src:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+        self.size = 0
+
+    def drop_rotated(self):
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
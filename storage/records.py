@@ -0,0 +1,79 @@
+import sys
+
+from storage.recurrence import RepeatRule
+
+
+class Record:
+    """task หรือ event หนึ่งรายการ ใช้ schema เดียวกันทั้งสองแบบ
+
+    ใช้ __slots__ แทน dict ทำให้แต่ละ record ใช้หน่วยความจำน้อยลงหลายเท่า
+    และสตริงวันที่ / เวลาที่ซ้ำกันถูก intern ให้ใช้ object เดียวกัน
+    แปลงจาก / เป็น dict รูปแบบของ data.json เฉพาะที่ชั้น storage เท่านั้น
+    (task ใน data.json ใช้ key "task" แทน "title" และไม่มี "time")
+    event ที่เกิดซ้ำเก็บเป็น record เดียวที่มี repeat (RepeatRule) วันที่ date คือครั้งแรก
+    """
+
+    __slots__ = ("id", "kind", "title", "date", "time", "details", "done", "due", "repeat")
+
+    def __init__(self, id, kind, title, date="", time="", details="", done=False, due=None, repeat=None):
+        self.id = id
+        self.kind = kind  # "tasks" / "events"
+        self.title = title
+        self.date = sys.intern(date)
+        self.time = sys.intern(time)
+        self.details = details
+        self.done = done
+        self.due = due  # datetime ที่ store แปลงไว้ (None ถ้าไม่มีวันที่หรือรูปแบบผิด)
+        self.repeat = repeat  # RepeatRule หรือ None ถ้าไม่เกิดซ้ำ
+
+    @property
+    def is_task(self) -> bool:
+        return self.kind == "tasks"
+
+    @classmethod
+    def from_dict(cls, kind: str, data: dict) -> "Record":
+        return cls(
+            data.get("id", ""),
+            kind,
+            data.get("task", "") if kind == "tasks" else data.get("title", ""),
+            data.get("date", ""),
+            "" if kind == "tasks" else data.get("time", ""),
+            data.get("details", ""),
+            bool(data.get("done", False)),
+            repeat=RepeatRule.from_dict(data["repeat"]) if data.get("repeat") else None,
+        )
+
+    def to_dict(self) -> dict:
+        if self.is_task:
+            return {
+                "id": self.id,
+                "task": self.title,
+                "date": self.date,
+                "details": self.details,
+                "done": self.done,
+            }
+        data = {
+            "id": self.id,
+            "title": self.title,
+            "date": self.date,
+            "time": self.time,
+            "details": self.details,
+            "done": self.done,
+        }
+        if self.repeat is not None:
+            data["repeat"] = self.repeat.to_dict()
+        return data
+
+    def update(self, fields: dict):
+        """แก้ไขหลาย field พร้อมกัน ("task" ของ journal รุ่นก่อนถือเป็น "title")"""
+        for name, value in fields.items():
+            if name == "task":
+                name = "title"
+            if name in ("date", "time"):
+                value = sys.intern(value)
+            elif name == "repeat" and isinstance(value, dict):
+                value = RepeatRule.from_dict(value) if value else None
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"Record({self.kind}, {self.id!r}, {self.title!r}, {self.date!r} {self.time!r}, done={self.done})"
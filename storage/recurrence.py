@@ -0,0 +1,232 @@
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+FREQUENCIES = ("daily", "weekly")
+# occurrence ที่ยังไม่ถึงกำหนดนับล่วงหน้าไม่เกินช่วงนี้ (กิจกรรมที่ไม่มีวันสิ้นสุดจะได้ไม่ยาวไม่รู้จบ)
+UPCOMING_HORIZON = timedelta(days=90)
+# จำนวนช่วงเวลา (เดือนในปฏิทิน / หน้าในรายการ) ที่เก็บ occurrence ที่ขยายแล้วไว้
+OCCURRENCE_CACHE_WINDOWS = 16
+
+
+class RepeatRule:
+    """กฎการเกิดซ้ำของกิจกรรม เก็บใน data.json เป็น "repeat" ของ event
+
+    freq "daily" ทุก interval วัน หรือ "weekly" ทุก interval สัปดาห์ในวัน weekdays
+    (0 = จันทร์ ถ้าว่างใช้วันเดียวกับวันเริ่ม) จนถึง until (รวมวันนั้น ว่าง = ไม่สิ้นสุด)
+    exceptions คือวันที่ที่ถูกลบออกทีละครั้ง completed คือวันที่ที่ทำเสร็จแล้ว
+    """
+
+    __slots__ = ("freq", "interval", "weekdays", "until", "exceptions", "completed")
+
+    def __init__(self, freq, interval=1, weekdays=(), until="", exceptions=(), completed=()):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"unknown repeat frequency {freq!r}")
+        self.freq = freq
+        self.interval = max(1, int(interval))
+        self.weekdays = tuple(sorted(set(weekdays)))
+        self.until = date.fromisoformat(until) if until else None
+        self.exceptions = frozenset(exceptions)
+        self.completed = frozenset(completed)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RepeatRule":
+        return cls(
+            data["freq"],
+            data.get("interval", 1),
+            data.get("weekdays", ()),
+            data.get("until", ""),
+            data.get("exceptions", ()),
+            data.get("completed", ()),
+        )
+
+    def to_dict(self) -> dict:
+        data = {"freq": self.freq, "interval": self.interval}
+        if self.weekdays:
+            data["weekdays"] = list(self.weekdays)
+        if self.until:
+            data["until"] = self.until.isoformat()
+        if self.exceptions:
+            data["exceptions"] = sorted(self.exceptions)
+        if self.completed:
+            data["completed"] = sorted(self.completed)
+        return data
+
+    def days(self, first: date, start: date, end: date) -> list:
+        """วันที่เกิดขึ้นในช่วง [start, end) ของกิจกรรมที่เริ่มวันที่ first"""
+        start = max(start, first)
+        if self.until is not None:
+            end = min(end, self.until + timedelta(days=1))
+        days = []
+        if start >= end:
+            return days
+
+        if self.freq == "daily":
+            # ข้ามไปครั้งแรกที่ไม่ก่อน start เลย ไม่ต้องไล่ตั้งแต่วันเริ่ม
+            skip = -(-(start - first).days // self.interval)
+            day = first + timedelta(days=skip * self.interval)
+            step = timedelta(days=self.interval)
+            while day < end:
+                days.append(day)
+                day += step
+        else:
+            weekdays = self.weekdays or (first.weekday(),)
+            first_week = first - timedelta(days=first.weekday())
+            week = start - timedelta(days=start.weekday())
+            behind = (week - first_week).days // 7 % self.interval
+            if behind:
+                week += timedelta(weeks=self.interval - behind)
+            step = timedelta(weeks=self.interval)
+            while week < end:
+                for weekday in weekdays:
+                    day = week + timedelta(days=weekday)
+                    if start <= day < end:
+                        days.append(day)
+                week += step
+
+        return [day for day in days if day.isoformat() not in self.exceptions]
+
+
+class Occurrence:
+    """กิจกรรมที่เกิดซ้ำหนึ่งครั้ง หน้าจอใช้ได้เหมือน Record (id เป็น "<id ของ record>@<วันที่>")"""
+
+    __slots__ = ("series", "day", "due", "done")
+
+    def __init__(self, series, day, due, done):
+        self.series = series
+        self.day = day
+        self.due = due
+        self.done = done
+
+    @property
+    def id(self):
+        return occurrence_id(self.series.id, self.day)
+
+    @property
+    def date(self):
+        return self.day.isoformat()
+
+    @property
+    def kind(self):
+        return self.series.kind
+
+    @property
+    def title(self):
+        return self.series.title
+
+    @property
+    def time(self):
+        return self.series.time
+
+    @property
+    def details(self):
+        return self.series.details
+
+    @property
+    def repeat(self):
+        return None
+
+
+def occurrence_id(record_id: str, day: date) -> str:
+    return f"{record_id}@{day.isoformat()}"
+
+
+def split_occurrence_id(record_id: str):
+    """(id ของ record, วันที่) ถ้าเป็น id ของ occurrence ไม่งั้น None"""
+    if "@" not in record_id:
+        return None
+    series_id, day = record_id.split("@", 1)
+    return series_id, date.fromisoformat(day)
+
+
+def month_window(year: int, month: int):
+    """ช่วง [วันแรกของเดือน, วันแรกของเดือนถัดไป) สำหรับ occurrences()"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def expand(record, start: datetime, end: datetime) -> list:
+    """occurrence ของ record ที่ครบกำหนดในช่วง [start, end) เรียงตามเวลา"""
+    if record.due is None:
+        return []
+    rule = record.repeat
+    at = record.due.time()
+    occurrences = []
+    for day in rule.days(record.due.date(), start.date(), end.date() + timedelta(days=1)):
+        due = datetime.combine(day, at)
+        if start <= due < end:
+            done = record.done or day.isoformat() in rule.completed
+            occurrences.append(Occurrence(record, day, due, done))
+    return occurrences
+
+
+def nearest_occurrence(record, now: datetime):
+    """occurrence ถัดไปนับจาก now หรือครั้งล่าสุดถ้าชุดนี้ไม่มีครั้งต่อไปแล้ว (None ถ้าไม่มีเลย)"""
+    if record.due is None:
+        return None
+    upcoming = expand(record, now, max(now, record.due) + UPCOMING_HORIZON)
+    if upcoming:
+        return upcoming[0]
+    past = expand(record, record.due, now)
+    return past[-1] if past else None
+
+
+class RecurringEvents:
+    """ส่วนที่ทุก backend ใช้ร่วมกัน: ขยาย occurrence เฉพาะช่วงที่ถูกขอ และ cache ไว้ตามช่วง
+
+    backend ต้องมี recurring() ที่คืน record ที่มี repeat และเรียก invalidate_occurrences()
+    เมื่อ record เหล่านั้นเปลี่ยน
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._occurrences = OrderedDict()  # (start, end) -> [Occurrence]
+
+    def invalidate_occurrences(self):
+        self._occurrences.clear()
+
+    def occurrences(self, start: datetime, end: datetime) -> list:
+        """occurrence ของทุก record ที่เกิดซ้ำในช่วง [start, end) เรียงตามเวลา"""
+        key = (start, end)
+        cached = self._occurrences.get(key)
+        if cached is not None:
+            self._occurrences.move_to_end(key)
+            return cached
+        occurrences = [o for record in self.recurring() for o in expand(record, start, end)]
+        occurrences.sort(key=lambda o: (o.due, o.series.id))
+        self._occurrences[key] = occurrences
+        while len(self._occurrences) > OCCURRENCE_CACHE_WINDOWS:
+            self._occurrences.popitem(last=False)
+        return occurrences
+
+    def add_occurrence_counts(self, summary: dict, year: int, month: int) -> dict:
+        """เพิ่มจำนวน occurrence ของเดือนนี้ลงใน {วันที่: (ทั้งหมด, ยังไม่เสร็จ)}"""
+        for occurrence in self.occurrences(*month_window(year, month)):
+            total, pending = summary.get(occurrence.day.day, (0, 0))
+            summary[occurrence.day.day] = (total + 1, pending + (not occurrence.done))
+        return summary
+
+    def toggle_occurrence(self, record_id: str, day: date):
+        """สลับสถานะเสร็จ / ไม่เสร็จของกิจกรรมที่เกิดซ้ำเฉพาะวันที่ day"""
+        rule = self.get(record_id).repeat.to_dict()
+        completed = set(rule.get("completed", ()))
+        completed ^= {day.isoformat()}
+        rule["completed"] = sorted(completed)
+        self.edit(record_id, repeat=rule)
+
+    def skip_occurrence(self, record_id: str, day: date):
+        """ลบกิจกรรมที่เกิดซ้ำเฉพาะวันที่ day (ครั้งอื่นยังอยู่)"""
+        rule = self.get(record_id).repeat.to_dict()
+        rule["exceptions"] = sorted(set(rule.get("exceptions", ())) | {day.isoformat()})
+        self.edit(record_id, repeat=rule)
+
+    def end_series(self, record_id: str, day: date):
+        """ให้กิจกรรมที่เกิดซ้ำจบที่วันที่ day (ครั้งนั้นเป็นครั้งสุดท้าย) ลบทั้งชุดใช้ delete()"""
+        rule = self.get(record_id).repeat.to_dict()
+        last = day.isoformat()
+        rule["until"] = last
+        # วันที่หลังจากนี้ไม่มีแล้ว ไม่ต้องจำว่าข้าม / ทำเสร็จ
+        for key in ("exceptions", "completed"):
+            if key in rule:
+                rule[key] = [d for d in rule[key] if d <= last]
+        self.edit(record_id, repeat=rule)
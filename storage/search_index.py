@@ -0,0 +1,127 @@
+import re
+import heapq
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import datetime
+from itertools import chain
+
+from kivy.logger import Logger
+
+from storage.data_store import get_store
+
+# ภาษาไทยไม่เว้นวรรคระหว่างคำ จึงแยกช่วงตัวอักษรไทยออกมาแล้วทำเป็น bigram
+# ส่วนภาษาอื่นใช้ทั้งคำ (ตัวอักษร / ตัวเลขติดกัน) เป็น token
+THAI_RUN = re.compile(r"[\u0e00-\u0e7f]+")
+TOKEN = re.compile(r"[\u0e00-\u0e7f]+|[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def thai_grams(run: str) -> list:
+    """ตัดข้อความไทยเป็นคู่ตัวอักษรที่ซ้อนกัน เช่น "สอบ" -> ["สอ", "อบ"]"""
+    if len(run) == 1:
+        return [run]
+    return [run[i : i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for run in TOKEN.findall(normalize(text)):
+        if THAI_RUN.match(run):
+            tokens.extend(thai_grams(run))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class SearchIndex:
+    """inverted index จาก token ใน title และ details ไปยัง id ของ record
+
+    สร้างครั้งเดียวจาก store แล้วอัปเดตทีละ record ผ่าน listener ของ store
+    คำภาษาอังกฤษ / ตัวเลขค้นแบบขึ้นต้นด้วย (prefix) ส่วนภาษาไทยค้นด้วย bigram
+    ทุก token ในคำค้นต้องพบใน record เดียวกัน (AND)
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._postings = {}  # token -> set ของ record id
+        self._terms = []  # token ทั้งหมดเรียงตามตัวอักษร สำหรับค้นแบบ prefix
+        self._doc_terms = {}  # record id -> token ของ record นั้น
+        self._keys = {}  # record id -> ลำดับเวลา (ใหม่กว่า = มากกว่า)
+        for record in chain(store.tasks, store.events):
+            self._add(record)
+        self._terms.sort()
+        store.add_listener(self.on_store_change)
+        Logger.info(f"Search: indexed {len(self._doc_terms)} records, {len(self._terms)} terms")
+
+    def on_store_change(self, op, record):
+        for one in record if op == "add_many" else (record,):
+            self._remove(one.id)
+            if op != "delete":
+                self._add(one, keep_sorted=True)
+
+    def _add(self, record, keep_sorted=False):
+        terms = set(tokenize(record.title)) | set(tokenize(record.details))
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = set()
+                if keep_sorted:
+                    insort(self._terms, term)
+                else:
+                    self._terms.append(term)
+            posting.add(record.id)
+        self._doc_terms[record.id] = tuple(terms)
+        self._keys[record.id] = (record.due or datetime.min, record.id)
+
+    def _remove(self, record_id):
+        for term in self._doc_terms.pop(record_id, ()):
+            posting = self._postings[term]
+            posting.discard(record_id)
+            if not posting:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+        self._keys.pop(record_id, None)
+
+    def _prefix(self, prefix):
+        """รวม id ของทุก token ที่ขึ้นต้นด้วย prefix"""
+        matches = set()
+        index = bisect_left(self._terms, prefix)
+        while index < len(self._terms) and self._terms[index].startswith(prefix):
+            matches |= self._postings[self._terms[index]]
+            index += 1
+        return matches
+
+    def search(self, text: str, limit=None) -> list:
+        """id ของ record ที่ตรงกับคำค้น เรียงจากใหม่ไปเก่า"""
+        postings = []
+        for run in TOKEN.findall(normalize(text)):
+            if THAI_RUN.match(run) and len(run) > 1:
+                postings.extend(self._postings.get(gram, set()) for gram in thai_grams(run))
+            else:
+                postings.append(self._prefix(run))
+        if not postings:
+            return []
+
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            if not matches:
+                break
+            matches &= posting
+        if limit is None:
+            return sorted(matches, key=self._keys.__getitem__, reverse=True)
+        return heapq.nlargest(limit, matches, key=self._keys.__getitem__)
+
+
+_index = None
+
+
+def get_search_index() -> SearchIndex:
+    """สร้าง index ครั้งแรกที่ถูกเรียก แล้วใช้ตัวเดิมตลอด"""
+    global _index
+    if _index is None:
+        _index = SearchIndex(get_store())
+    return _index
@@ -0,0 +1,361 @@
+import os
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+from kivy.logger import Logger
+
+from storage.data_store import DataStore, StoreListeners, new_id, parse_due
+from storage.records import Record
+from storage.recurrence import UPCOMING_HORIZON, RecurringEvents, RepeatRule, month_window
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL DEFAULT '',
+    time TEXT NOT NULL DEFAULT '',
+    details TEXT NOT NULL DEFAULT '',
+    done INTEGER NOT NULL DEFAULT 0,
+    due TEXT,
+    repeat TEXT
+);
+CREATE INDEX IF NOT EXISTS records_date ON records (date);
+CREATE INDEX IF NOT EXISTS records_done_due ON records (done, due);
+CREATE INDEX IF NOT EXISTS records_timeline ON records (COALESCE(due, ''), id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+COLUMNS = "id, kind, title, date, time, details, done, due, repeat"
+PLACEHOLDERS = ", ".join("?" * len(COLUMNS.split(", ")))
+# กิจกรรมที่เกิดซ้ำขยายเป็น occurrence แยกต่างหาก ไม่นับเป็นแถวตามวันที่ของครั้งแรก
+ONE_OFF = "repeat IS NULL"
+
+
+def record_from_row(row) -> Record:
+    record_id, kind, title, date, time, details, done, due, repeat = row
+    return Record(
+        record_id,
+        kind,
+        title,
+        date,
+        time,
+        details,
+        bool(done),
+        datetime.fromisoformat(due) if due else None,
+        RepeatRule.from_dict(json.loads(repeat)) if repeat else None,
+    )
+
+
+def row_from_record(record: Record):
+    return (
+        record.id,
+        record.kind,
+        record.title,
+        record.date,
+        record.time,
+        record.details,
+        int(record.done),
+        due_text(record.date, record.time),
+        json.dumps(record.repeat.to_dict()) if record.repeat is not None else None,
+    )
+
+
+def due_text(date: str, time: str):
+    if not date:
+        return None
+    try:
+        return parse_due(date, time).isoformat(sep=" ")
+    except ValueError:
+        return None
+
+
+class SQLiteStore(RecurringEvents, StoreListeners):
+    """backend แบบ SQLite ที่มีเมธอดเหมือน DataStore
+
+    ทุกการแก้ไขเป็น transaction เล็ก ๆ ที่เขียนเฉพาะแถวที่เปลี่ยน
+    และการค้นหาตามวันที่ / สถานะใช้ index ของตาราง
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.malformed = {}
+        self._conn = None
+
+    # ------------------ Load / Save ------------------
+    def load(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(records)")]
+            if "repeat" not in columns:
+                # ฐานข้อมูลที่สร้างก่อนมีกิจกรรมที่เกิดซ้ำ
+                self._conn.execute("ALTER TABLE records ADD COLUMN repeat TEXT")
+            for record_id, date, time in self._conn.execute(
+                "SELECT id, date, time FROM records WHERE date != '' AND due IS NULL"
+            ):
+                Logger.warning(f"Storage: record {record_id} has a malformed date {date!r} {time!r}")
+                self.malformed[record_id] = f"{date} {time}".strip()
+        return self._conn
+
+    def save(self):
+        self.load().commit()
+
+    def flush(self):
+        self.save()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def _query(self, sql, params=()):
+        return [record_from_row(row) for row in self.load().execute(sql, params)]
+
+    # ------------------ Accessors ------------------
+    @property
+    def tasks(self):
+        return self._query(f"SELECT {COLUMNS} FROM records WHERE kind = 'tasks' ORDER BY rowid")
+
+    @property
+    def events(self):
+        return self._query(f"SELECT {COLUMNS} FROM records WHERE kind = 'events' ORDER BY rowid")
+
+    def get(self, record_id: str) -> Record:
+        records = self._query(f"SELECT {COLUMNS} FROM records WHERE id = ?", (record_id,))
+        if not records:
+            raise KeyError(record_id)
+        return records[0]
+
+    def due(self, record_id: str):
+        row = self.load().execute("SELECT due FROM records WHERE id = ?", (record_id,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def recurring(self):
+        return self._query(f"SELECT {COLUMNS} FROM records WHERE repeat IS NOT NULL")
+
+    def on_date(self, date_key: str):
+        records = self._query(
+            f"SELECT {COLUMNS} FROM records WHERE date = ? AND {ONE_OFF} ORDER BY rowid", (date_key,)
+        )
+        try:
+            start = datetime.strptime(date_key, "%Y-%m-%d")
+        except ValueError:
+            return records
+        return records + self.occurrences(start, start + timedelta(days=1))
+
+    def month_summary(self, year: int, month: int) -> dict:
+        start, end = month_range(year, month)
+        rows = self.load().execute(
+            "SELECT date, COUNT(*), SUM(done = 0) FROM records"
+            f" WHERE date >= ? AND date < ? AND {ONE_OFF} GROUP BY date",
+            (start, end),
+        )
+        summary = {int(date[8:10]): (total, pending) for date, total, pending in rows}
+        return self.add_occurrence_counts(summary, year, month)
+
+    # ------------------ Queries ------------------
+    def events_in_month(self, year: int, month: int) -> list:
+        start, end = month_range(year, month)
+        records = self._query(
+            f"SELECT {COLUMNS} FROM records WHERE date >= ? AND date < ? AND {ONE_OFF}",
+            (start, end),
+        )
+        records.extend(self.occurrences(*month_window(year, month)))
+        records.sort(key=lambda r: (r.date, r.time))
+        return records
+
+    def pending_upcoming(self, now=None, limit=None) -> list:
+        now = now or datetime.now()
+        upcoming = self._query(
+            f"SELECT {COLUMNS} FROM records WHERE done = 0 AND due >= ? AND {ONE_OFF}"
+            " ORDER BY due LIMIT ?",
+            (now.isoformat(sep=" "), -1 if limit is None else limit),
+        )
+        upcoming.extend(o for o in self.occurrences(now, now + UPCOMING_HORIZON) if not o.done)
+        upcoming.sort(key=lambda r: r.due)
+        return upcoming[:limit]
+
+    @staticmethod
+    def timeline_key(record: Record):
+        return (record.due.isoformat(sep=" ") if record.due else "", record.id)
+
+    @staticmethod
+    def moment_key(moment: datetime):
+        return (moment.isoformat(sep=" "), "")
+
+    def timeline_page(self, after=None, limit=50, before=None) -> list:
+        # ใช้ index records_timeline อ่านเฉพาะแถวของหน้านี้ ไม่ต้องอ่านประวัติทั้งหมด
+        if before is not None:
+            page = self._query(
+                f"SELECT {COLUMNS} FROM records WHERE (COALESCE(due, ''), id) > (?, ?) AND {ONE_OFF}"
+                " ORDER BY COALESCE(due, '') ASC, id ASC LIMIT ?",
+                (*before, limit),
+            )
+            page.reverse()
+            return page
+        if after is None:
+            return self._query(
+                f"SELECT {COLUMNS} FROM records WHERE {ONE_OFF}"
+                " ORDER BY COALESCE(due, '') DESC, id DESC LIMIT ?",
+                (limit,),
+            )
+        return self._query(
+            f"SELECT {COLUMNS} FROM records WHERE (COALESCE(due, ''), id) < (?, ?) AND {ONE_OFF}"
+            " ORDER BY COALESCE(due, '') DESC, id DESC LIMIT ?",
+            (*after, limit),
+        )
+
+    def events_before(self, cutoff: datetime) -> list:
+        return self._query(
+            f"SELECT {COLUMNS} FROM records WHERE kind = 'events' AND due < ? AND {ONE_OFF} ORDER BY due",
+            (cutoff.isoformat(sep=" "),),
+        )
+
+    def search_title(self, text: str) -> list:
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self._query(
+            f"SELECT {COLUMNS} FROM records WHERE title LIKE ? ESCAPE '\\' ORDER BY date DESC",
+            (pattern,),
+        )
+
+    @property
+    def class_image(self) -> str:
+        row = self.load().execute("SELECT value FROM meta WHERE key = 'class_image'").fetchone()
+        return row[0] if row else ""
+
+    def set_class_image(self, path: str):
+        with self.load():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('class_image', ?)", (path,)
+            )
+
+    @property
+    def archive_keep(self) -> list:
+        row = self.load().execute("SELECT value FROM meta WHERE key = 'archive_keep'").fetchone()
+        return json.loads(row[0]) if row else []
+
+    def set_archive_keep(self, record_ids: list):
+        with self.load():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('archive_keep', ?)",
+                (json.dumps(list(record_ids)),),
+            )
+
+    # ------------------ Mutations ------------------
+    def add_event(self, title: str, date: str, time: str = "", details: str = "", repeat=None) -> Record:
+        rule = RepeatRule.from_dict(repeat) if repeat else None
+        record = Record(new_id(), "events", title, date, time, details, repeat=rule)
+        with self.load():
+            self._insert(record)
+        self._changed(record)
+        self._notify("add", record)
+        return record
+
+    def add_events(self, records: list) -> list:
+        """เพิ่มหลาย record ใน transaction เดียว"""
+        with self.load():
+            for record in records:
+                self._insert(record)
+        for record in records:
+            self._changed(record)
+        self._notify("add_many", records)
+        return records
+
+    def toggle_done(self, record_id: str):
+        with self.load():
+            self._conn.execute("UPDATE records SET done = 1 - done WHERE id = ?", (record_id,))
+        record = self.get(record_id)
+        self._changed(record)
+        self._notify("update", record)
+
+    def edit(self, record_id: str, **fields):
+        record = self.get(record_id)
+        self._changed(record)
+        record.update(fields)
+        with self.load():
+            self._conn.execute("DELETE FROM records WHERE id = ?", (record_id,))
+            self._insert(record)
+        self._changed(record)
+        self._notify("update", record)
+
+    def delete(self, record_id: str):
+        record = self.get(record_id)
+        with self.load():
+            self._conn.execute("DELETE FROM records WHERE id = ?", (record_id,))
+        self.malformed.pop(record_id, None)
+        self._changed(record)
+        self._notify("delete", record)
+
+    def delete_many(self, record_ids: list):
+        records = [self.get(record_id) for record_id in record_ids]
+        with self.load():
+            self._conn.executemany("DELETE FROM records WHERE id = ?", [(r.id,) for r in records])
+        for record in records:
+            self.malformed.pop(record.id, None)
+            self._changed(record)
+            self._notify("delete", record)
+
+    def _changed(self, record: Record):
+        if record.repeat is not None:
+            self.invalidate_occurrences()
+
+    def _insert(self, record: Record):
+        row = row_from_record(record)
+        self._conn.execute(f"INSERT INTO records ({COLUMNS}) VALUES ({PLACEHOLDERS})", row)
+        record.due = datetime.fromisoformat(row[7]) if row[7] else None
+        if record.date and row[7] is None:
+            Logger.warning(f"Storage: record {record.id} has a malformed date {record.date!r} {record.time!r}")
+            self.malformed[record.id] = f"{record.date} {record.time}".strip()
+        else:
+            self.malformed.pop(record.id, None)
+
+
+def month_range(year: int, month: int):
+    """ช่วง [วันแรกของเดือน, วันแรกของเดือนถัดไป) สำหรับเทียบกับคอลัมน์ date"""
+    if month == 12:
+        return f"{year}-12-01", f"{year + 1}-01-01"
+    return f"{year}-{month:02d}-01", f"{year}-{month + 1:02d}-01"
+
+
+def migrate_json(json_path, db_path):
+    """ย้ายข้อมูลทั้งหมดจาก data.json (รวม journal) ไปไว้ในฐานข้อมูล SQLite ครั้งเดียว"""
+    source = DataStore(json_path)
+    source.load()
+
+    # สร้างในไฟล์ชั่วคราวก่อน ถ้าย้ายไม่สำเร็จจะไม่เหลือฐานข้อมูลครึ่ง ๆ กลาง ๆ
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    store = SQLiteStore(tmp_path)
+    conn = store.load()
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO records ({COLUMNS}) VALUES ({PLACEHOLDERS})",
+            [row_from_record(t) for t in source.tasks] + [row_from_record(e) for e in source.events],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('class_image', ?)",
+            (source.class_image,),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('archive_keep', ?)",
+            (json.dumps(source.archive_keep),),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)",
+            (json_path,),
+        )
+    source.close()
+    store.close()
+    os.replace(tmp_path, db_path)
+    Logger.info(f"Storage: migrated {json_path} to {db_path}")
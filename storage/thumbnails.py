@@ -0,0 +1,80 @@
+import os
+
+from kivy.logger import Logger
+
+from storage.data_store import DATA_DIR
+from storage.image_store import file_digest
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # ไม่มี Pillow: ใช้รูปต้นฉบับแทน
+    PILImage = None
+
+THUMB_DIR = os.path.join(DATA_DIR, "cache", "thumbs")
+# ขนาดด้านที่ยาวที่สุด (pixel) ของรูปย่อแต่ละแบบ
+THUMB_SIZES = {"screen": 1280, "preview": 480}
+# เมื่อ cache ใหญ่เกินนี้ ลบรูปที่ไม่ได้ใช้นานที่สุดออกก่อน
+CACHE_LIMIT_BYTES = 32 * 1024 * 1024
+
+
+def get_thumbnail(source, size_name="screen"):
+    """path ของรูปย่อขนาด size_name ของ source (สร้างใหม่ถ้ายังไม่มีใน cache)
+
+    คืน source เดิมถ้าสร้างรูปย่อไม่ได้ (ไม่มี Pillow / อ่านไฟล์ไม่ได้)
+    """
+    if not source or PILImage is None or not os.path.isfile(source):
+        return source
+    try:
+        digest = file_digest(source)
+        for ext in (".jpg", ".png"):
+            path = os.path.join(THUMB_DIR, f"{digest}_{size_name}{ext}")
+            if os.path.exists(path):
+                os.utime(path)  # บันทึกว่าเพิ่งถูกใช้ สำหรับ LRU
+                return path
+        return make_thumbnail(source, digest, size_name)
+    except OSError as e:
+        Logger.warning(f"Thumbnails: cannot make {size_name} thumbnail of {source}: {e}")
+        return source
+
+
+def ensure_thumbnails(source):
+    """สร้างรูปย่อทุกขนาดไว้ล่วงหน้า (เรียกตอน apply รูปใหม่)"""
+    for size_name in THUMB_SIZES:
+        get_thumbnail(source, size_name)
+
+
+def make_thumbnail(source, digest, size_name):
+    max_edge = THUMB_SIZES[size_name]
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    with PILImage.open(source) as img:
+        # JPEG ถอดรหัสที่ความละเอียดต่ำได้เลย เร็วกว่าถอดเต็มแล้วย่อมาก
+        img.draft("RGB", (max_edge, max_edge))
+        img.thumbnail((max_edge, max_edge))
+        has_alpha = img.mode in ("RGBA", "LA", "P")
+        if has_alpha:
+            path = os.path.join(THUMB_DIR, f"{digest}_{size_name}.png")
+            img.save(path + ".tmp", "PNG")
+        else:
+            path = os.path.join(THUMB_DIR, f"{digest}_{size_name}.jpg")
+            img.convert("RGB").save(path + ".tmp", "JPEG", quality=85)
+    os.replace(path + ".tmp", path)
+    evict()
+    return path
+
+
+def evict(limit=CACHE_LIMIT_BYTES):
+    """ลบรูปย่อที่ไม่ได้ใช้นานที่สุดจนขนาด cache ไม่เกิน limit"""
+    entries = []
+    total = 0
+    with os.scandir(THUMB_DIR) as it:
+        for entry in it:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        os.remove(path)
+        total -= size
@@ -0,0 +1,69 @@
+import time
+import threading
+
+from kivy.logger import Logger
+
+
+class BackgroundWriter:
+    """รวมคำขอบันทึกที่เข้ามาติด ๆ กันให้เหลือการเขียนครั้งเดียวบน worker thread
+
+    request() คืนค่าทันที การเขียนจริงจะเกิดเมื่อไม่มีคำขอใหม่เข้ามา
+    เป็นเวลา delay วินาที ส่วน flush() เขียนงานที่ค้างอยู่ให้เสร็จทันที
+    """
+
+    def __init__(self, write_fn, delay=0.5):
+        self.write_fn = write_fn
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._pending = False
+        self._writing = False
+        self._deadline = 0.0
+        self._thread = None
+
+    def request(self):
+        with self._cond:
+            self._pending = True
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self):
+        """เขียนงานที่ค้างอยู่บน thread ที่เรียก (ใช้ตอน on_pause / on_stop)"""
+        with self._cond:
+            while self._writing:
+                self._cond.wait()
+            if not self._pending:
+                return
+            self._pending = False
+            self._writing = True
+        self._write()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending and not self._writing:
+                        remaining = self._deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                self._pending = False
+                self._writing = True
+            self._write()
+
+    def _write(self):
+        try:
+            self.write_fn()
+        except OSError as e:
+            Logger.error(f"Storage: background save failed: {e}")
+            with self._cond:
+                self._pending = True
+                self._deadline = time.monotonic() + self.delay
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()